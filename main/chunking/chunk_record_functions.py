@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Gemeinsamer Chunk-Record-Builder für process_document (PDF), process_document_html
+(Tutorials) und spark_ingestion -> dasselbe Dokument ergibt überall denselben Record
+(Text, Felder, damit auch Embedding und content_hash im Delta-Sync).
+"""
+from pathlib import Path
+from typing import Optional
+from clean_pdf_functions import clean_text, should_drop_chunk
+from gazetteer_functions import Gazetteer
+
+def doc_meta_from_path(pdf_path: Path) -> dict:
+    category = pdf_path.parent.parent.name
+    product  = pdf_path.parent.name
+    filename = pdf_path.stem  # Dateiname ohne .pdf
+    parts = filename.split("_")  # ["Elements", "Bluetooth", "Espressif", "ESP32-C3-MINI-1U"]
+    element = None
+    if parts and parts[0] == "Elements":
+        element = "_".join(parts[:2])
+    tutorial = None
+    if parts and parts[0] == "Tutorial":
+        tutorial = "_".join(parts[:2])
+    return {"category": category, "product": product, "element": element, "tutorial": tutorial}
+
+def build_chunk_records(pdf_path: Path, doc, chunker, tokenizer, gazetteer: Optional[Gazetteer] = None) -> list:
+    meta = doc_meta_from_path(pdf_path)
+    category, product = meta["category"], meta["product"]
+    element, tutorial = meta["element"], meta["tutorial"]
+
+    header = f"[Product: {product}] [Category: {category}] [Element of {product}: {element}]"
+    if pdf_path.suffix.lower() in {".html", ".htm"}:
+        header += f" [Tutorial: {tutorial}] "
+
+    raw_chunks = list(chunker.chunk(dl_doc=doc))
+    total_chunks = len(raw_chunks)
+
+    records = []
+    for i, ch in enumerate(raw_chunks):
+        text_raw = clean_text(ch.text or "")
+        if len(text_raw) < 30:
+            continue
+
+        context = clean_text(chunker.contextualize(chunk=ch))
+        if len(context.split()) < 25:
+            continue
+
+        if should_drop_chunk(ch, context): 
+            continue
+
+        # section (defensiv)
+        section = None
+        hp = getattr(ch, "hierarchy_path", None)
+        if isinstance(hp, list) and hp:
+            last = hp[-1]
+            if isinstance(last, dict):
+                section = last.get("title")
+
+        mentions = gazetteer.mentions(context, exclude=(product,)) if gazetteer else []
+        n_tokens = tokenizer.count_tokens(context)
+        semantic_density = round(n_tokens / max(1, len(context)), 4)
+
+        rec = {
+            "category": category,
+            "chunk_id": f"{pdf_path.stem}::c{i}",
+            "chunk_size": n_tokens,
+            "chunk_type": "contextualized",
+            "product": product,
+            "element": element,
+            "tutorial": tutorial,
+            "section": section,
+            # Erwähnungen anderer Boards/Bauteile (ohne das eigene Produkt)
+            "mentions": [name for name, _ in mentions],
+            "mention_kinds": [kind for _, kind in mentions],
+            "semantic_density": semantic_density,
+            "text": f"{header}\n\n{context}",
+            "total_chunks": total_chunks,
+        }
+        records.append(rec)
+    return records
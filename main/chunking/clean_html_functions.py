@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+HTML-Vorverarbeitung der Tutorials mit austauschbarem Backend, parallel über einen
+Thread- oder Process-Pool. Jedes Backend bekommt rohes HTML und liefert bereinigtes
+HTML für Docling (Codeblöcke als ```-Fences in <pre>, Inline-Code in Backticks).
+
+  soup         bisherige BeautifulSoup-Bereinigung aus build_docling_from_html (mehrere find_all-Durchläufe)
+  readability  readability-lxml Artikelkörper, danach lxml_stream für die Code-Fences
+  trafilatura  trafilatura.extract(output_format="html"), danach lxml_stream
+  lxml_stream  ein Durchlauf mit lxml-Parser-Target (SAX-artig, kein DOM)
+
+    results = clean_files(paths, backend="lxml_stream", workers=8, executor="process")
+    bench = benchmark_backends(paths)      # Durchsatz, Output-Größe, Anteil erhaltener Codeblöcke
+"""
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# gleiche Noise-Tags wie die bisherige Soup-Bereinigung
+NOISE_TAGS = {"script", "style", "noscript", "header", "footer", "nav", "aside", "form", "svg"}
+# Tags, die lxml_stream (ohne Attribute) übernimmt; alles andere wird entfernt, der Text bleibt
+KEEP_TAGS = {
+    "html", "head", "title", "body", "main", "article", "section", "div",
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "blockquote",
+    "table", "thead", "tbody", "tr", "th", "td", "strong", "b", "em", "i",
+}
+# innerhalb von <pre>: Elemente, die eine Code-Zeile abschließen (Prism: div.token-line),
+# und Zeilennummern-Spalten, deren Text nicht in den Code gehört
+PRE_LINE_TAGS = {"div", "p", "li"}
+PRE_LINE_CLASSES = {"token-line"}
+GUTTER_CLASSES = {"line-number", "line-numbers-rows"}
+
+# ---------------- Backends ----------------
+def clean_soup(raw_html: str) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw_html, "lxml")
+
+    # Noise entfernen
+    for tag in soup(sorted(NOISE_TAGS)):
+        tag.decompose()
+
+    # Codeblöcke in Markdown-Fences
+    for pre in soup.find_all("pre"):
+        code = pre.get_text("\n", strip=True)
+        pre.string = f"\n```\n{code}\n```\n"
+
+    # Inline-Code markieren
+    for c in soup.find_all("code"):
+        txt = c.get_text(" ", strip=True)
+        c.string = f"`{txt}`"
+
+    # Absätze/Listen normalisieren
+    for el in soup.find_all(["p", "li"]):
+        if el.string:
+            el.string.replace_with(re.sub(r"\s+\n\s+", "\n", el.string))
+
+    return str(soup)
+
+class _StreamCleaner:
+    """
+    Parser-Target für lxml.etree.HTMLParser: bekommt start/end/data-Events in Dokument-
+    reihenfolge und schreibt direkt das bereinigte HTML. <pre>-Inhalt bleibt roh
+    (Einrückung, Syntax-Highlighting-<span>s), statt pro Textknoten umzubrechen; Zeilen-
+    Elemente (div.token-line, <br>) werden zu "\n", Zeilennummern (span.line-number) entfallen.
+    """
+
+    def __init__(self):
+        self.out: List[str] = []
+        self.skip_tag: Optional[str] = None
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.code_depth = 0
+        self.buf: List[str] = []
+        # Elemente innerhalb von <pre>: (ist Zeilennummer, schließt Zeile ab)
+        self.pre_stack: List[tuple] = []
+        self.gutter_depth = 0
+        self.line_depth = 0
+
+    def start(self, tag, attrib=None):
+        tag = str(tag).lower()
+        if self.skip_tag:
+            # nur gleichnamige Tags zählen, void-Elemente im Noise-Block sind egal
+            self.skip_depth += tag == self.skip_tag
+            return
+        if tag in NOISE_TAGS:
+            self.skip_tag, self.skip_depth = tag, 1
+            return
+        if tag == "pre":
+            self.pre_depth += 1
+            if self.pre_depth == 1:
+                self.buf = []
+                self.pre_stack, self.gutter_depth, self.line_depth = [], 0, 0
+            return
+        if self.pre_depth:
+            classes = set(((attrib or {}).get("class") or "").split())
+            gutter = bool(classes & GUTTER_CLASSES)
+            line = not gutter and (tag in PRE_LINE_TAGS or bool(classes & PRE_LINE_CLASSES))
+            self.pre_stack.append((gutter, line))
+            self.gutter_depth += gutter
+            self.line_depth += line
+            return
+        if tag == "code":
+            self.code_depth += 1
+            if self.code_depth == 1:
+                self.buf = []
+            return
+        if tag in KEEP_TAGS and not self.code_depth:
+            self.out.append(f"<{tag}>")
+
+    def end(self, tag):
+        tag = str(tag).lower()
+        if self.skip_tag:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if not self.skip_depth:
+                    self.skip_tag = None
+            return
+        if tag == "pre" and self.pre_depth:
+            self.pre_depth -= 1
+            if not self.pre_depth:
+                code = "".join(self.buf).strip("\n")
+                self.out.append(f"<pre>\n```\n{html.escape(code, quote=False)}\n```\n</pre>")
+            return
+        if self.pre_depth:
+            gutter, line = self.pre_stack.pop() if self.pre_stack else (False, False)
+            self.gutter_depth -= gutter
+            if tag == "br" and not self.gutter_depth:
+                self.buf.append("\n")
+            if line:
+                self.line_depth -= 1
+                # verschachtelte Zeilen-Elemente (code.token-line > span.token-line) nur einmal umbrechen
+                if not self.line_depth:
+                    self.buf.append("\n")
+            return
+        if tag == "code" and self.code_depth:
+            self.code_depth -= 1
+            if not self.code_depth:
+                txt = " ".join("".join(self.buf).split())
+                self.out.append(f"<code>`{html.escape(txt, quote=False)}`</code>")
+            return
+        if tag in KEEP_TAGS and not self.code_depth:
+            self.out.append(f"</{tag}>")
+
+    def data(self, data):
+        if self.skip_tag:
+            return
+        if self.pre_depth or self.code_depth:
+            if not self.gutter_depth:
+                self.buf.append(data)
+            return
+        self.out.append(html.escape(re.sub(r"\s+\n\s+", "\n", data), quote=False))
+
+    def comment(self, text):
+        pass
+
+    def close(self) -> str:
+        return "".join(self.out)
+
+def clean_lxml_stream(raw_html: str) -> str:
+    from lxml import etree
+    parser = etree.HTMLParser(target=_StreamCleaner(), remove_comments=True, remove_pis=True)
+    parser.feed(raw_html)
+    return parser.close()
+
+def clean_readability(raw_html: str) -> str:
+    from readability import Document
+    return clean_lxml_stream(Document(raw_html).summary(html_partial=False))
+
+def clean_trafilatura(raw_html: str) -> str:
+    import trafilatura
+    extracted = trafilatura.extract(
+        raw_html, output_format="html", include_formatting=True,
+        include_tables=True, include_comments=False, include_images=False, favor_recall=True,
+    )
+    return clean_lxml_stream(extracted) if extracted else ""
+
+BACKENDS: Dict[str, Callable[[str], str]] = {
+    "soup": clean_soup,
+    "readability": clean_readability,
+    "trafilatura": clean_trafilatura,
+    "lxml_stream": clean_lxml_stream,
+}
+
+def clean_html(raw_html: str, backend: str = "soup") -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"unbekanntes HTML-Backend: {backend!r} (vorhanden: {list(BACKENDS)})")
+    return BACKENDS[backend](raw_html)
+
+# ---------------- Pool ----------------
+def _clean_path(args) -> Dict[str, Any]:
+    # Top-Level-Funktion, damit der Process-Pool sie pickeln kann
+    path, backend = args
+    raw = ""
+    try:
+        # Lesefehler ebenfalls pro Datei melden, sonst bricht pool.map den ganzen Batch ab
+        raw = Path(path).read_text(encoding="utf-8", errors="ignore")
+        t0 = time.perf_counter()
+        cleaned = clean_html(raw, backend)
+    except Exception as e:
+        return {"path": path, "in_bytes": len(raw.encode("utf-8")), "error": f"{type(e).__name__}: {e}"}
+    return {
+        "path": path,
+        "in_bytes": len(raw.encode("utf-8")),
+        "out_bytes": len(cleaned.encode("utf-8")),
+        "clean_s": time.perf_counter() - t0,
+        "html": cleaned,
+    }
+
+def clean_files(paths: Sequence[Path], backend: str = "soup", workers: Optional[int] = None,
+                executor: str = "process") -> List[Dict[str, Any]]:
+    """
+    Bereinigt alle Dateien parallel. "process" für soup/readability (reines Python, GIL),
+    "thread" reicht für lxml_stream (libxml2 gibt die GIL beim Parsen frei).
+    Ergebnis in Eingabereihenfolge; Fehler stehen pro Datei unter "error".
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unbekanntes HTML-Backend: {backend!r} (vorhanden: {list(BACKENDS)})")
+    jobs = [(str(p), backend) for p in paths]
+    if not jobs:
+        return []
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers == 1:
+        return [_clean_path(j) for j in jobs]
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        return list(pool.map(_clean_path, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+# ---------------- Codeblock-Check ----------------
+# führende Zeilennummer ("1void setup() {" aus einer Gutter-Spalte)
+_GUTTER_RE = re.compile(r"^\d+\s*")
+
+def _code_lines(text: str) -> List[str]:
+    """
+    Zeilenweise normalisiert: Whitespace innerhalb der Zeile zusammengefasst, Zeilennummern
+    und reine Fence-/Leerzeilen entfernt. Zeilenumbrüche zählen – "1void setup() {2  // ..."
+    in einer Zeile ist kein erhaltener Code.
+    """
+    out = []
+    for line in (text or "").splitlines():
+        line = _GUTTER_RE.sub("", " ".join(line.split()))
+        if line.strip("`"):
+            out.append(line)
+    return out
+
+def _has_class(el, classes) -> bool:
+    return bool(set((el.get("class") or "").split()) & classes)
+
+def _pre_text(pre) -> str:
+    """Text eines Roh-<pre> mit Zeilenumbrüchen an div.token-line/<br>, ohne Zeilennummern-Spalte."""
+    for el in list(pre.iter()):
+        if el is not pre and _has_class(el, GUTTER_CLASSES):
+            el.drop_tree()
+    for el in pre.iter():
+        if el is pre:
+            continue
+        if el.tag == "br" or el.tag in PRE_LINE_TAGS or _has_class(el, PRE_LINE_CLASSES):
+            el.tail = "\n" + (el.tail or "")
+    return pre.text_content()
+
+def code_blocks(raw_html: str) -> List[List[str]]:
+    from lxml import html as lxml_html
+    if not raw_html.strip():
+        return []
+    tree = lxml_html.fromstring(raw_html)
+    return [b for b in (_code_lines(_pre_text(pre)) for pre in tree.iter("pre")) if b]
+
+def code_kept(blocks: List[List[str]], cleaned_html: str) -> int:
+    """Anzahl der Original-<pre>-Blöcke, deren Zeilen zusammenhängend und in Reihenfolge im bereinigten Output stehen."""
+    if not blocks:
+        return 0
+    from lxml import html as lxml_html
+    lines = _code_lines(lxml_html.fromstring(cleaned_html).text_content()) if cleaned_html.strip() else []
+    text = "\n" + "\n".join(lines) + "\n"
+    return sum(("\n" + "\n".join(b) + "\n") in text for b in blocks)
+
+# ---------------- Benchmark ----------------
+def benchmark_backends(paths: Sequence[Path], backends: Optional[Sequence[str]] = None,
+                       workers: Optional[int] = None, executor: str = "process") -> List[Dict[str, Any]]:
+    paths = [Path(p) for p in paths]
+    # Referenz-Codeblöcke einmal aus dem Roh-HTML (nicht in der Zeitmessung)
+    blocks = {str(p): code_blocks(p.read_text(encoding="utf-8", errors="ignore")) for p in paths}
+    n_blocks = sum(len(b) for b in blocks.values())
+
+    results = []
+    for name in backends or list(BACKENDS):
+        try:
+            clean_html("<html><body><p>x</p></body></html>", name)
+        except ImportError as e:
+            print(f"[WARN] Backend {name} übersprungen: {e}")
+            continue
+        except Exception:
+            pass  # Mini-Dokument reicht manchen Extraktoren nicht; echte Fehler zählt clean_files pro Datei
+        t0 = time.perf_counter()
+        rows = clean_files(paths, name, workers, executor)
+        wall = time.perf_counter() - t0
+
+        ok = [r for r in rows if "error" not in r]
+        in_bytes = sum(r["in_bytes"] for r in rows)
+        out_bytes = sum(r["out_bytes"] for r in ok)
+        kept = sum(code_kept(blocks[r["path"]], r["html"]) for r in ok)
+        results.append({
+            "backend": name,
+            "executor": executor,
+            "workers": workers or min(len(paths), os.cpu_count() or 1),
+            "files": len(rows),
+            "errors": len(rows) - len(ok),
+            "wall_s": round(wall, 3),
+            "files_per_s": round(len(rows) / wall, 1) if wall else None,
+            "mb_per_s": round(in_bytes / 2**20 / wall, 2) if wall else None,
+            "out_bytes": out_bytes,
+            "out_ratio": round(out_bytes / in_bytes, 3) if in_bytes else None,
+            "code_blocks": n_blocks,
+            "code_kept": round(kept / n_blocks, 3) if n_blocks else 1.0,
+        })
+        print(f"[OK] {name}: {len(ok)}/{len(rows)} Dateien in {wall:.2f} s")
+    return results
+
+def pick_fastest(results: List[Dict[str, Any]], min_code_kept: float = 1.0) -> Optional[str]:
+    """Schnellstes Backend ohne Fehler, das mindestens min_code_kept der Codeblöcke erhält."""
+    ok = [r for r in results if not r["errors"] and r["code_kept"] >= min_code_kept]
+    return min(ok, key=lambda r: r["wall_s"])["backend"] if ok else None
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    header = f"{'backend':<12} {'files/s':>9} {'MB/s':>7} {'out KB':>9} {'ratio':>6} {'code':>6} {'err':>4}"
+    rows = [header]
+    for r in results:
+        rows.append(
+            f"{r['backend']:<12} {r['files_per_s'] or '-':>9} {r['mb_per_s'] or '-':>7} "
+            f"{r['out_bytes'] // 1024:>9} {r['out_ratio'] or '-':>6} {r['code_kept']:>6} {r['errors']:>4}"
+        )
+    return "\n".join(rows)
+
+# ---------------- main ----------------
+def main():
+    import argparse
+    from datetime import datetime
+    from experiments.chunker_hybrid_unified import resolve_root
+
+    ap = argparse.ArgumentParser(description="Benchmark HTML cleaning backends")
+    ap.add_argument("--doc-root", type=Path, default=None)
+    ap.add_argument("--backends", nargs="*", default=None, choices=list(BACKENDS))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--executor", choices=["process", "thread"], default="process")
+    ap.add_argument("--min-code-kept", type=float, default=1.0)
+    args = ap.parse_args()
+
+    root = resolve_root()
+    doc_root = args.doc_root or (root / "documents")
+    paths = sorted(p for p in doc_root.rglob("*.htm*") if p.is_file())
+    if not paths:
+        print(f"Keine HTML-Dateien unter {doc_root}")
+        return
+
+    results = benchmark_backends(paths, args.backends, args.workers, args.executor)
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    out_path = root / "out" / "_bench" / f"html_cleaners_{ts}.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps({"timestamp": ts, "doc_root": str(doc_root), "results": results},
+                                   indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(format_table(results))
+    print(f"Schnellstes Backend mit code_kept >= {args.min_code_kept}: {pick_fastest(results, args.min_code_kept) or '-'}")
+    print(f"✅ Ergebnis → {out_path}")
+
+if __name__ == "__main__":
+    main()
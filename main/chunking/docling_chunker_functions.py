@@ -6,7 +6,7 @@ from transformers import AutoTokenizer
 from pathlib import Path
 from docling.chunking import HybridChunker
 
-def convert_documents_into_docling_doc(pdf_path: Path):
+def build_pdf_converter():
     ocr_opts = TesseractCliOcrOptions(lang=["eng"])  # OCR nur Englisch
 
     pdf_options = PdfPipelineOptions(
@@ -14,7 +14,9 @@ def convert_documents_into_docling_doc(pdf_path: Path):
         force_full_page_ocr=True, # für alle Seiten erzwingen
         generate_page_images=False,
         generate_table_images=False,
+        do_table_structure=True,  # Tabellen-Struktur behalten (Spec-Tabellen, siehe table_spec_functions)
     )
+    pdf_options.table_structure_options.do_cell_matching = True
 
         # Configure format options
     format_options = {
@@ -24,9 +26,13 @@ def convert_documents_into_docling_doc(pdf_path: Path):
         }
 
     # Initialize document converter
-    converter = DocumentConverter(
+    return DocumentConverter(
             format_options=format_options
         )
+
+def convert_documents_into_docling_doc(pdf_path: Path, converter=None):
+    # converter can be reused (e.g. once per Spark partition), model loading is the expensive part
+    converter = converter or build_pdf_converter()
     result = converter.convert(str(pdf_path))
     doc = result.document
     return doc
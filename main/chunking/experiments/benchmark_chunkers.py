@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark der Chunking-Strategien auf demselben Dokument-Set:
+
+  docling_hybrid        HybridChunker aus docling_chunker_functions (Produktionspfad, contextualize)
+  unified               unified_chunk            (chunker_docling_hybrid.py)
+  hybrid_unified        hybrid_chunk             (chunker_hybrid_unified.py)
+  langchain_recursive   RecursiveCharacterTextSplitter wie in langchain_code.ipynb (800/120 Zeichen)
+
+docling_hybrid_chunk (chunker_docling_hybrid.py) fehlt bewusst: HybridChunker(max_tokens=...,
+overlap_tokens=...).chunk(elements) wirft immer, die Funktion ist also unified_chunk + Exception.
+
+Die Docling-Konvertierung läuft einmal pro Dokument und wird separat ausgewiesen, damit nur
+das Chunking verglichen wird. Pro Strategie: Chunks/s, Peak-Speicher (tracemalloc),
+Chunk-Anzahl, Token-Verteilung (Tokenizer des Embedding-Modells) und Retrieval-Hit-Rate
+gegen ein kleines gelabeltes Fragen-Set (benchmark_questions.jsonl: {"q", "answer", "product"}).
+Ein Treffer zählt, wenn einer der Top-k-Chunks zum Produkt der Frage gehört und die Antwort
+enthält – unabhängig davon, wie der Chunker die Dokumente geschnitten hat.
+
+    python benchmark_chunkers.py --limit 10 --k 5
+    python benchmark_chunkers.py --doc-root "Portenta Familiy/documents" --min-hit-rate 0.8
+"""
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from chunker_hybrid_unified import discover_docs, resolve_root
+
+Strategy = Callable[[Dict[str, Any]], List[str]]
+
+# ---------------- DoclingDocument -> Element-Liste ----------------
+def docling_to_elements(doc) -> List[Dict[str, Any]]:
+    """
+    Flache Element-Liste im Format von parse_pdf/parse_html der Experiment-Chunker.
+    (parse_pdf dort liest Attribute, die es am DoclingDocument nicht gibt -> hier über iterate_items.)
+    """
+    out: List[Dict[str, Any]] = []
+    section_path: List[str] = []
+    for item, _level in doc.iterate_items():
+        label = str(getattr(getattr(item, "label", None), "value", getattr(item, "label", "paragraph"))).lower()
+        prov = getattr(item, "prov", None) or []
+        page = prov[0].page_no if prov else None
+        if label == "table":
+            md = item.export_to_markdown(doc=doc)
+            out.append({"type": "table", "text": md, "page": page,
+                        "section_path": list(section_path), "table_markdown": md})
+            continue
+        text = getattr(item, "text", None)
+        if not text:
+            continue
+        if label == "title":
+            section_path = [text]
+        elif label == "section_header":
+            lvl = max(1, getattr(item, "level", 1) or 1)
+            section_path = section_path[:lvl - 1] + [text]
+        out.append({"type": label, "text": text, "page": page,
+                    "section_path": list(section_path), "table_markdown": None})
+    return out
+
+# ---------------- Strategien ----------------
+def make_strategies(tokenizer, token_budget: int = 1000, chunk_size: int = 800,
+                    chunk_overlap: int = 120, only: Optional[Sequence[str]] = None) -> Dict[str, Strategy]:
+    """Baut die Strategien einmal (Modelle/Tokenizer laden zählt nicht zur Chunking-Zeit)."""
+    strategies: Dict[str, Strategy] = {}
+
+    try:
+        from docling_chunker_functions import chunk_documents_with_docling
+        chunker = chunk_documents_with_docling(None, tokenizer)
+
+        def docling_hybrid(entry):
+            return [chunker.contextualize(chunk=ch) for ch in chunker.chunk(dl_doc=entry["doc"])]
+        strategies["docling_hybrid"] = docling_hybrid
+    except ImportError as e:
+        print(f"[WARN] docling_hybrid übersprungen: {e}")
+
+    try:
+        from chunker_docling_hybrid import unified_chunk
+        from chunker_hybrid_unified import hybrid_chunk
+
+        def element_strategy(fn):
+            def run(entry):
+                elements = docling_to_elements(entry["doc"])
+                return [c.text for c in fn(elements, entry["doc_id"], token_budget=token_budget)]
+            return run
+        strategies["unified"] = element_strategy(unified_chunk)
+        strategies["hybrid_unified"] = element_strategy(hybrid_chunk)
+    except ImportError as e:
+        print(f"[WARN] Element-Chunker übersprungen: {e}")
+
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(
+            separators=["\n\n", "\n", ". ", " ", ""],
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len,
+        )
+
+        def langchain_recursive(entry):
+            return splitter.split_text(entry["doc"].export_to_markdown())
+        strategies["langchain_recursive"] = langchain_recursive
+    except ImportError as e:
+        print(f"[WARN] langchain_recursive übersprungen: {e}")
+
+    if only:
+        strategies = {k: v for k, v in strategies.items() if k in only}
+    return strategies
+
+# ---------------- Korpus ----------------
+def prepare_corpus(doc_root: Path, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Konvertiert jedes Dokument genau einmal (Converter wiederverwendet)."""
+    from docling_chunker_functions import build_pdf_converter, convert_documents_into_docling_doc
+    from prepare_html_functions import build_docling_from_html
+
+    items = sorted(discover_docs(doc_root), key=lambda it: it["path"])[:limit]
+    pdf_converter = html_converter = None
+    corpus = []
+    for it in items:
+        path = Path(it["path"])
+        t0 = time.perf_counter()
+        try:
+            if it["ext"] == ".pdf":
+                pdf_converter = pdf_converter or build_pdf_converter()
+                doc = convert_documents_into_docling_doc(path, pdf_converter)
+            else:
+                from docling.document_converter import DocumentConverter
+                html_converter = html_converter or DocumentConverter()
+                doc = build_docling_from_html(path, html_converter)
+        except Exception as e:
+            print(f"[ERROR] {path}: {e}")
+            continue
+        corpus.append({
+            "doc_id": os.path.relpath(path, doc_root),
+            "product": it["product"],
+            "doc": doc,
+            "convert_s": time.perf_counter() - t0,
+        })
+        print(f"[OK] konvertiert: {path.name} ({corpus[-1]['convert_s']:.1f} s)")
+    return corpus
+
+# ---------------- Messung ----------------
+def run_strategy(fn: Strategy, corpus: List[Dict[str, Any]], repeat: int = 3) -> Dict[str, Any]:
+    """Zeit = bester von `repeat` Läufen; Peak-Speicher in einem eigenen Lauf (tracemalloc bremst)."""
+    chunks: List[Dict[str, Any]] = []
+    best = float("inf")
+    for r in range(max(1, repeat)):
+        out = []
+        t0 = time.perf_counter()
+        for entry in corpus:
+            for text in fn(entry):
+                out.append({"doc_id": entry["doc_id"], "product": entry["product"], "text": text})
+        best = min(best, time.perf_counter() - t0)
+        if r == 0:
+            chunks = out
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        for entry in corpus:
+            fn(entry)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"chunks": chunks, "time_s": best, "peak_bytes": peak}
+
+def token_stats(texts: List[str], count_tokens: Callable[[str], int], limit: Optional[int] = None) -> Dict[str, Any]:
+    if not texts:
+        return {}
+    arr = np.asarray([count_tokens(t) for t in texts], dtype=np.int64)
+    stats = {
+        "mean": round(float(arr.mean()), 1),
+        "min": int(arr.min()),
+        "p50": int(np.percentile(arr, 50)),
+        "p95": int(np.percentile(arr, 95)),
+        "max": int(arr.max()),
+    }
+    if limit:
+        # alles über dem Limit schneidet das Embedding-Modell ab
+        stats["over_limit"] = round(float((arr > limit).mean()), 3)
+    return stats
+
+# ---------------- Retrieval-Qualität ----------------
+def load_questions(path: Path) -> List[Dict[str, Any]]:
+    with Path(path).open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "")).strip().lower()
+
+def _answers(q: Dict[str, Any]) -> List[str]:
+    a = q["answer"]
+    return [_norm(x) for x in (a if isinstance(a, list) else [a])]
+
+def evaluate_retrieval(chunks: List[Dict[str, Any]], questions: List[Dict[str, Any]],
+                       embed_fn: Callable[[List[str]], np.ndarray], k: int = 5) -> Dict[str, Any]:
+    """
+    relevant   Chunk enthält die Antwort und gehört zum Produkt der Frage (falls angegeben);
+               sonst zählen z. B. STM32H747-Chunks des Portenta H7 für die GIGA-Frage
+    hit_rate   Anteil Fragen mit relevantem Chunk in den Top-k
+    mrr        mittlerer reziproker Rang des ersten Treffers (0 wenn keiner in Top-k)
+    coverage   Anteil Fragen, deren Antwort überhaupt in einem Chunk steht (Obergrenze für hit_rate;
+               ein Chunker, der die Antwort zerschneidet, verliert hier)
+    """
+    texts = [_norm(c["text"]) for c in chunks]
+    if not texts or not questions:
+        return {"hit_rate": 0.0, "mrr": 0.0, "coverage": 0.0, "k": k, "questions": len(questions)}
+
+    t0 = time.perf_counter()
+    doc_vecs = embed_fn([c["text"] for c in chunks])
+    embed_s = time.perf_counter() - t0
+    q_vecs = embed_fn([q["q"] for q in questions])
+    scores = q_vecs @ doc_vecs.T
+
+    hits, rr, covered = 0, 0.0, 0
+    for qi, q in enumerate(questions):
+        answers = _answers(q)
+        product = q.get("product")
+        relevant = {
+            i for i, t in enumerate(texts)
+            if (not product or chunks[i]["product"] == product) and any(a in t for a in answers)
+        }
+        covered += bool(relevant)
+        top = np.argsort(-scores[qi])[:k]
+        rank = next((r for r, i in enumerate(top, 1) if int(i) in relevant), None)
+        if rank:
+            hits += 1
+            rr += 1.0 / rank
+    n = len(questions)
+    return {
+        "hit_rate": round(hits / n, 3),
+        "mrr": round(rr / n, 3),
+        "coverage": round(covered / n, 3),
+        "k": k,
+        "questions": n,
+        "embed_s": round(embed_s, 3),
+    }
+
+# ---------------- Benchmark ----------------
+def benchmark(
+    corpus: List[Dict[str, Any]],
+    strategies: Dict[str, Strategy],
+    count_tokens: Callable[[str], int],
+    questions: Optional[List[Dict[str, Any]]] = None,
+    embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+    k: int = 5,
+    repeat: int = 3,
+    embed_limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    results = []
+    for name, fn in strategies.items():
+        try:
+            run = run_strategy(fn, corpus, repeat=repeat)
+        except Exception as e:
+            print(f"[ERROR] {name}: {e}")
+            continue
+        chunks = run["chunks"]
+        res = {
+            "strategy": name,
+            "docs": len(corpus),
+            "chunks": len(chunks),
+            "time_s": round(run["time_s"], 4),
+            "chunks_per_s": round(len(chunks) / run["time_s"], 1) if run["time_s"] else None,
+            "peak_mb": round(run["peak_bytes"] / 2**20, 2),
+            "tokens": token_stats([c["text"] for c in chunks], count_tokens, embed_limit),
+        }
+        if questions and embed_fn is not None:
+            res["retrieval"] = evaluate_retrieval(chunks, questions, embed_fn, k=k)
+        results.append(res)
+        print(f"[OK] {name}: {len(chunks)} Chunks in {res['time_s']} s")
+    return results
+
+def pick_cheapest(results: List[Dict[str, Any]], min_hit_rate: float) -> Optional[str]:
+    """Schnellste Strategie, die die Qualitätsschwelle noch erreicht."""
+    ok = [r for r in results if r.get("retrieval", {}).get("hit_rate", 0.0) >= min_hit_rate]
+    return min(ok, key=lambda r: r["time_s"])["strategy"] if ok else None
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    header = (f"{'strategy':<22} {'chunks':>7} {'chunks/s':>10} {'peak MB':>8} "
+              f"{'tok p50':>8} {'tok p95':>8} {'>limit':>7} {'hit@k':>6} {'mrr':>6} {'cover':>6}")
+    rows = [header]
+    for r in results:
+        t, q = r.get("tokens", {}), r.get("retrieval", {})
+        rows.append(
+            f"{r['strategy']:<22} {r['chunks']:>7} {r['chunks_per_s'] or '-':>10} {r['peak_mb']:>8} "
+            f"{t.get('p50', '-'):>8} {t.get('p95', '-'):>8} {t.get('over_limit', '-'):>7} "
+            f"{q.get('hit_rate', '-'):>6} {q.get('mrr', '-'):>6} {q.get('coverage', '-'):>6}"
+        )
+    return "\n".join(rows)
+
+# ---------------- main ----------------
+def main():
+    import argparse
+
+    root = resolve_root()
+    ap = argparse.ArgumentParser(description="Benchmark chunking strategies (cost + retrieval quality)")
+    ap.add_argument("--doc-root", type=Path, default=root / "documents")
+    ap.add_argument("--questions", type=Path, default=Path(__file__).resolve().parent / "benchmark_questions.jsonl")
+    ap.add_argument("--limit", type=int, default=None, help="nur die ersten N Dokumente")
+    ap.add_argument("--strategies", nargs="*", default=None)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--token-budget", type=int, default=1000)
+    ap.add_argument("--embed-limit", type=int, default=256, help="max_seq_length des Embedding-Modells")
+    ap.add_argument("--min-hit-rate", type=float, default=0.8)
+    ap.add_argument("--no-retrieval", action="store_true")
+    args = ap.parse_args()
+
+    # Module aus chunking/ und retrieval/ importierbar machen
+    for sub in ("chunking", "retrieval"):
+        if str(root / sub) not in sys.path:
+            sys.path.insert(0, str(root / sub))
+    from docling_chunker_functions import return_tokenizer
+
+    if not args.doc_root.exists():
+        raise RuntimeError(f"documents-Ordner nicht gefunden: {args.doc_root}")
+
+    corpus = prepare_corpus(args.doc_root, args.limit)
+    if not corpus:
+        print(f"Keine Dateien unter {args.doc_root}")
+        return
+
+    tokenizer = return_tokenizer()
+    strategies = make_strategies(tokenizer, token_budget=args.token_budget, only=args.strategies)
+
+    questions, embed_fn = None, None
+    if not args.no_retrieval and args.questions.exists():
+        from chunk_io import embed_texts, load_embedder
+        products = {e["product"] for e in corpus}
+        # nur Fragen zu Produkten, die im Dokument-Set enthalten sind
+        questions = [q for q in load_questions(args.questions) if not q.get("product") or q["product"] in products]
+        model = load_embedder()
+        embed_fn = lambda texts: embed_texts(model, texts)
+
+    results = benchmark(corpus, strategies, tokenizer.count_tokens, questions, embed_fn,
+                        k=args.k, repeat=args.repeat, embed_limit=args.embed_limit)
+
+    payload = {
+        "timestamp": datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "doc_root": str(args.doc_root),
+        "convert_s": round(sum(e["convert_s"] for e in corpus), 2),
+        "results": results,
+    }
+    out_path = root / "out" / "_bench" / f"chunkers_{payload['timestamp']}.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(format_table(results))
+    if questions:
+        best = pick_cheapest(results, args.min_hit_rate)
+        print(f"Günstigste Strategie mit hit@{args.k} >= {args.min_hit_rate}: {best or '-'}")
+    print(f"✅ Ergebnis → {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Prüft extract_spec_rows (table_spec_functions.py) gegen typische Tabellen-Layouts der
+Arduino-Datenblätter (spec_table_fixtures.jsonl: {"name", "table", "expect"}). Die erste
+Tabellenzeile ist der Header; "expect" listet pro Spec-Zeile die erwarteten Felder.
+
+    python check_spec_tables.py
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from table_spec_functions import extract_spec_rows
+
+def fake_doc(table_rows):
+    """Minimales Docling-Ersatzobjekt: doc.tables[i].data.grid[r][c].text / .column_header."""
+    grid = [[SimpleNamespace(text=text, column_header=(r == 0)) for text in row]
+            for r, row in enumerate(table_rows)]
+    return SimpleNamespace(tables=[SimpleNamespace(data=SimpleNamespace(grid=grid), prov=[])])
+
+def check(path: Path) -> int:
+    failed = 0
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        case = json.loads(line)
+        rows = extract_spec_rows(fake_doc(case["table"]), "Fixture", "Fixtures", case["name"])
+        got = [{k: r.get(k) for k in exp} for r, exp in zip(rows, case["expect"])]
+        if len(rows) != len(case["expect"]) or got != case["expect"]:
+            failed += 1
+            print(f"[ERROR] {case['name']}: erwartet {case['expect']}, erhalten {rows}")
+        else:
+            print(f"[OK] {case['name']}")
+    return failed
+
+if __name__ == "__main__":
+    sys.exit(1 if check(Path(__file__).resolve().parent / "spec_table_fixtures.jsonl") else 0)
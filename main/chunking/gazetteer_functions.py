@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Gazetteer für Produkt-/Bauteil-Erwähnungen, automatisch aus dem documents/-Baum gebaut
+und als Aho-Corasick-Automat kompiliert -> Tagging jedes Chunks in linearer Zeit
+(statt spaCy + rapidfuzz im kg_first_test.ipynb).
+
+Quellen:
+  - Ordnernamen (Familie / Produkt; nur mehrwortig, z. B. "Nano Family", "Nano 33 BLE")
+  - Artikelnummern aus den Datenblatt-Dateinamen (ABXnnnnn, ASXnnnnn, AKXnnnnn, AFXnnnnn, Annnnnn)
+  - Bauteil-Dateien (Elements_*, z. B. "NXP SE050C2 IoT Secure Element.pdf") -> Teilenummern-Tokens
+  - feste Aliase (PRODUCT_ALIASES für einwortige Produkte, COMPONENT_ALIASES)
+
+    gaz = build_gazetteer(doc_root)
+    gaz.tag("... uses the NINA-W10 and the SE050C2 ...")  # -> ["u-blox NINA-W10", "SE050C2 IoT Secure Element"]
+"""
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Arduino-Artikelnummern (auch in Text, der nicht im Gazetteer steht)
+PART_NUMBER_RE = re.compile(r"\b(?:A[BSKF]X\d{5}|A\d{6})\b", re.IGNORECASE)
+# Teilenummern-artige Tokens in Bauteil-Dateinamen: Buchstaben + Ziffern, >= 5 Zeichen
+COMPONENT_TOKEN_RE = re.compile(r"\b(?=[A-Za-z0-9-]*\d)(?=[A-Za-z0-9-]*[A-Za-z])[A-Za-z0-9][A-Za-z0-9-]{4,}\b")
+
+COMPONENT_ALIASES = {
+    "se050c2": "SE050C2 IoT Secure Element",
+    "se050": "SE050C2 IoT Secure Element",
+    "nina-w10": "u-blox NINA-W10",
+    "nina-w102": "u-blox NINA-W10",
+}
+
+# einwortige Produktordner ("Nano", "Due") sind im Fließtext oft normale Wörter ("other nano
+# boards", "due to") -> nur über Artikelnummer oder diese eindeutigen Schreibweisen
+PRODUCT_ALIASES = {
+    "arduino due": "Due",
+    "opta": "Opta",
+    "alvik": "Alvik",
+    "stella": "Stella",
+}
+
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").lower()).strip()
+
+class Gazetteer:
+    """Aho-Corasick über normalisierten (lowercase, Whitespace zusammengefasst) Text."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self.entries: List[Tuple[str, str, str]] = []  # (alias, canonical, kind)
+        self._aliases: Dict[str, int] = {}
+        self._compiled = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, alias: str, canonical: str, kind: str):
+        alias = _norm(alias)
+        if len(alias) < 3 or alias in self._aliases:
+            return
+        self._aliases[alias] = len(self.entries)
+        self.entries.append((alias, canonical, kind))
+        node = 0
+        for ch in alias:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+            node = nxt
+        self._out[node].append(self._aliases[alias])
+        self._compiled = False
+
+    def canonical_of(self, alias: str) -> Optional[str]:
+        e = self._aliases.get(_norm(alias))
+        return None if e is None else self.entries[e][1]
+
+    def kind_of(self, canonical: str) -> Optional[str]:
+        return next((k for _, c, k in self.entries if c == canonical), None)
+
+    def compile(self):
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._compiled = True
+        return self
+
+    def find(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """Nicht überlappende Treffer (start, end, canonical, kind), längster Treffer gewinnt."""
+        if not self._compiled:
+            self.compile()
+        t = _norm(text)
+        hits = []
+        node = 0
+        for i, ch in enumerate(t):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for e in self._out[node]:
+                alias, canonical, kind = self.entries[e]
+                start = i - len(alias) + 1
+                # Wortgrenzen: "se050" nicht in "se050c2" matchen
+                if start > 0 and t[start - 1].isalnum():
+                    continue
+                if i + 1 < len(t) and t[i + 1].isalnum():
+                    continue
+                hits.append((start, i + 1, canonical, kind))
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        out, last_end = [], -1
+        for h in hits:
+            if h[0] >= last_end:
+                out.append(h)
+                last_end = h[1]
+        return out
+
+    def mentions(self, text: str, exclude: Tuple[str, ...] = ()) -> List[Tuple[str, str]]:
+        """(canonical, kind) aller Erwähnungen (Reihenfolge des ersten Auftretens, ohne Duplikate)."""
+        found = [(c, k) for _, _, c, k in self.find(text)]
+        for m in PART_NUMBER_RE.findall(text or ""):
+            # unbekannte Artikelnummern trotzdem als Erwähnung behalten
+            if _norm(m) not in self._aliases:
+                found.append((m.upper(), "part_number"))
+        out: Dict[str, str] = {}
+        for name, kind in found:
+            if name not in exclude:
+                out.setdefault(name, kind)
+        return list(out.items())
+
+    def tag(self, text: str, exclude: Tuple[str, ...] = ()) -> List[str]:
+        """Nur die kanonischen Namen aus mentions()."""
+        return [name for name, _ in self.mentions(text, exclude)]
+
+# ---------------- Aufbau aus documents/ ----------------
+def _component_name(stem: str) -> str:
+    # "Elements_ Bluetooth_Espressif ESP32-C3-MINI-1U" -> "Espressif ESP32-C3-MINI-1U"
+    parts = stem.split("_")
+    if parts and parts[0] == "Elements":
+        return parts[-1].strip()
+    return stem.strip()
+
+def build_gazetteer(doc_root: Path, extra_aliases: Optional[Dict[str, str]] = None) -> Gazetteer:
+    gaz = Gazetteer()
+    part_owner: Dict[str, set] = {}
+    components: List[Tuple[str, str]] = []
+
+    for fam in sorted(p for p in Path(doc_root).iterdir() if p.is_dir()):
+        # einwortige Familien ("Education", "Mega", "Kits") sind normale Wörter -> kein Alias
+        if " " in fam.name.strip():
+            gaz.add(fam.name, fam.name, "family")
+        for prod in sorted(p for p in fam.iterdir() if p.is_dir()):
+            if " " in prod.name.strip():
+                gaz.add(prod.name, prod.name, "product")
+            for f in prod.iterdir():
+                if not f.is_file() or f.suffix.lower() not in {".pdf", ".html", ".htm"}:
+                    continue
+                stem = f.stem
+                if stem.startswith("Tutorial"):
+                    continue
+                parts = PART_NUMBER_RE.findall(stem)
+                for pn in parts:
+                    part_owner.setdefault(pn.upper(), set()).add(prod.name)
+                # Bauteil-Datenblätter liegen als PDF neben dem Produkt-Datenblatt
+                if not parts and f.suffix.lower() == ".pdf" and "datasheet" not in stem.lower() \
+                        and _norm(stem) != _norm(prod.name):
+                    components.append((stem, prod.name))
+
+    # Artikelnummer -> Produkt; mehrdeutige Nummern (H7 / H7 Lite) bleiben als Nummer stehen
+    for pn, owners in part_owner.items():
+        gaz.add(pn, next(iter(owners)) if len(owners) == 1 else pn, "product" if len(owners) == 1 else "part_number")
+
+    for alias, canonical in PRODUCT_ALIASES.items():
+        gaz.add(alias, canonical, "product")
+
+    # feste Aliase zuerst, damit die Namen aus dem Graphen (Component.name) kanonisch bleiben
+    for alias, canonical in {**COMPONENT_ALIASES, **(extra_aliases or {})}.items():
+        gaz.add(alias, canonical, "component")
+
+    for stem, _ in components:
+        name = _component_name(stem)
+        tokens = COMPONENT_TOKEN_RE.findall(name)
+        # "NXP SE050C2 IoT Secure Element" -> gleicher kanonischer Name wie der Alias "se050c2"
+        canonical = next((gaz.canonical_of(t) for t in tokens if gaz.canonical_of(t)), name)
+        gaz.add(name, canonical, "component")
+        for tok in tokens:
+            gaz.add(tok, canonical, "component")
+    return gaz.compile()
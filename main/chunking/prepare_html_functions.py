@@ -1,45 +1,25 @@
-import re
-from bs4 import BeautifulSoup
-from tempfile import NamedTemporaryFile
+from io import BytesIO
+from typing import Optional
+from docling.datamodel.base_models import DocumentStream
 from docling.document_converter import DocumentConverter
 from pathlib import Path
+from clean_html_functions import clean_html
 
-def build_docling_from_html(html_path: Path):
+def build_docling_from_html(html_path: Path, converter=None, backend: str = "soup",
+                            cleaned: Optional[str] = None):
     """
-    Lädt eine HTML-Datei, bereinigt sie (Code, Boilerplate etc.)
-    und gibt ein DoclingDocument-Objekt zurück.
+    Lädt eine HTML-Datei, bereinigt sie (Code, Boilerplate etc.; Backend siehe
+    clean_html_functions) und gibt ein DoclingDocument-Objekt zurück.
+    `cleaned` = bereits vorbereinigtes HTML (z. B. aus clean_files im Pool).
     """
     # 1️⃣ HTML laden und säubern
-    raw_html = html_path.read_text(encoding="utf-8", errors="ignore")
-    soup = BeautifulSoup(raw_html, "lxml")
-
-    # Noise entfernen
-    for tag in soup(["script","style","noscript","header","footer","nav","aside","form","svg"]):
-        tag.decompose()
-
-    # Codeblöcke in Markdown-Fences
-    for pre in soup.find_all("pre"):
-        code = pre.get_text("\n", strip=True)
-        pre.string = f"\n```\n{code}\n```\n"
-
-    # Inline-Code markieren
-    for c in soup.find_all("code"):
-        txt = c.get_text(" ", strip=True)
-        c.string = f"`{txt}`"
-
-    # Absätze/Listen normalisieren
-    for el in soup.find_all(["p","li"]):
-        if el.string:
-            el.string.replace_with(re.sub(r"\s+\n\s+", "\n", el.string))
-
-    clean_html = str(soup)
-
-    # 2️⃣ Temporäre Datei schreiben & mit Docling konvertieren
-    with NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8") as tmp:
-        tmp.write(clean_html)
-        tmp_path = tmp.name
-
-    converter = DocumentConverter()
-    doc = converter.convert(tmp_path).document
+    if cleaned is None:
+        raw_html = html_path.read_text(encoding="utf-8", errors="ignore")
+        cleaned = clean_html(raw_html, backend)
+
+    # 2️⃣ Direkt aus dem Speicher konvertieren (keine Temp-Datei pro Tutorial)
+    converter = converter or DocumentConverter()
+    stream = DocumentStream(name=html_path.name, stream=BytesIO(cleaned.encode("utf-8")))
+    doc = converter.convert(stream).document
 
     return doc
@@ -2,7 +2,6 @@ from pathlib import Path
 import os
 import subprocess
 from typing import Iterable, Optional
-from clean_pdf_functions import clean_text, should_drop_chunk
 import importlib
 import docling_chunker_functions
 from pathlib import Path
@@ -10,6 +9,9 @@ import json
 importlib.reload(docling_chunker_functions)
 
 from docling_chunker_functions import convert_documents_into_docling_doc, chunk_documents_with_docling, return_tokenizer
+from table_spec_functions import SpecStore, extract_spec_rows
+from gazetteer_functions import Gazetteer, build_gazetteer
+from chunk_record_functions import build_chunk_records
 
 def get_repo_root(
     start_path: Optional[Path] = None,
@@ -42,58 +44,14 @@ def get_repo_root(
     print(Path(os.getcwd()))
     return Path(os.getcwd())
 
-def process_pdf(pdf_path: Path, out_dir: Path, doc, chunker, tokenizer):
+def process_pdf(pdf_path: Path, out_dir: Path, doc, chunker, tokenizer, gazetteer: Optional[Gazetteer] = None):
 
     category = pdf_path.parent.parent.name
-    product  = pdf_path.parent.name
-    filename = pdf_path.stem  # Dateiname ohne .pdf
-    parts = filename.split("_")  # ["Elements", "Bluetooth", "Espressif", "ESP32-C3-MINI-1U"]
-    element = None
-    if parts and parts[0] == "Elements":
-        element = "_".join(parts[:2])
-    
     out_path = out_dir / category / "docling_chunks.jsonl"
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    raw_chunks = list(chunker.chunk(dl_doc=doc))
-    total_chunks = len(raw_chunks)
 
-    records = []
-    for i, ch in enumerate(raw_chunks):
-        text_raw = clean_text(ch.text or "")
-        if len(text_raw) < 30:
-            continue
-
-        context = clean_text(chunker.contextualize(chunk=ch))
-        if len(context.split()) < 25:
-            continue
-
-        if should_drop_chunk(ch, context): 
-            continue
-
-        # section (defensiv)
-        section = None
-        hp = getattr(ch, "hierarchy_path", None)
-        if isinstance(hp, list) and hp:
-            last = hp[-1]
-            if isinstance(last, dict):
-                section = last.get("title")
-
-        n_tokens = tokenizer.count_tokens(context)
-        semantic_density = round(n_tokens / max(1, len(context)), 4)
-
-        rec = {
-            "category": category,
-            "chunk_id": f"{pdf_path.stem}::c{i}",
-            "chunk_size": n_tokens,
-            "chunk_type": "contextualized",
-            "product": product,
-            "section": section,
-            "semantic_density": semantic_density,
-            "text": f"[Product: {product}] [Category: {category}] [Element of {product}: {element}]\n\n{context}",
-            "total_chunks": total_chunks,
-        }
-        records.append(rec)
+    # gleicher Record-Builder wie HTML-Driver und Spark
+    records = build_chunk_records(pdf_path, doc, chunker, tokenizer, gazetteer)
 
     with open(out_path, "a", encoding="utf-8") as f:
         for r in records:
@@ -104,7 +62,8 @@ def process_pdf(pdf_path: Path, out_dir: Path, doc, chunker, tokenizer):
 def iterate_product_docs(
     doc_root: Optional[Path] = None,
     out_dir: Optional[Path] = None,
-    doc=None, chunker=None, tokenizer=None
+    doc=None, chunker=None, tokenizer=None, spec_store: Optional[SpecStore] = None,
+    gazetteer: Optional[Gazetteer] = None
 ):
     # Root/Default-Pfade nur setzen, wenn nichts übergeben wurde
     if doc_root is None or out_dir is None:
@@ -117,6 +76,8 @@ def iterate_product_docs(
 
     # load tokenizer
     tokenizer = tokenizer or return_tokenizer()
+    # Gazetteer einmal aus dem documents/-Baum bauen, dann jeden Chunk taggen
+    gazetteer = gazetteer or build_gazetteer(doc_root)
 
     for pdf_path in doc_root.rglob("*.pdf"):
         # ensure pdf_path is a file
@@ -130,7 +91,13 @@ def iterate_product_docs(
         doc = convert_documents_into_docling_doc(pdf_path)
         chunker_for_doc = chunk_documents_with_docling(doc, tokenizer) if chunker is None else chunker
 
-        process_pdf(pdf_path, out_dir, doc, chunker_for_doc, tokenizer)
+        process_pdf(pdf_path, out_dir, doc, chunker_for_doc, tokenizer, gazetteer)
+
+        # Spec-Tabellen strukturiert ablegen (clean_text wirft die Tabellenzeilen aus den Chunks)
+        if spec_store is not None:
+            rows = extract_spec_rows(doc, pdf_path.parent.name, pdf_path.parent.parent.name, str(pdf_path))
+            n = spec_store.add_rows(rows, source=str(pdf_path))
+            print(f"[OK] {n} Spec-Zeilen gespeichert: {spec_store.path}")
 
 
     
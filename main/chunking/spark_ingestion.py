@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Verteilte Ingestion auf Spark: Konvertierung + Chunking laufen auf den Executors
+statt nur auf dem Driver. Lokal testbar mit master("local[*]").
+
+    spark = get_local_spark()
+    ingest_with_spark(spark, doc_root, table_name="docling_chunks")
+"""
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+# Schema der Chunk-Records (gleiche Felder wie docling_chunks.jsonl + Quellpfad)
+CHUNK_SCHEMA = (
+    "category string, chunk_id string, chunk_size int, chunk_type string, "
+    "product string, element string, tutorial string, section string, mentions array<string>, mention_kinds array<string>, "
+    "semantic_density double, text string, total_chunks int, source_path string"
+)
+
+# Module, die die Executors importieren müssen
+_EXECUTOR_MODULES = [
+    "clean_pdf_functions.py",
+    "clean_html_functions.py",
+    "chunk_record_functions.py",
+    "gazetteer_functions.py",
+    "docling_chunker_functions.py",
+    "prepare_html_functions.py",
+    "spark_ingestion.py",
+]
+
+# ---------------- Spark Session ----------------
+def get_local_spark(app_name: str = "docling-ingestion"):
+    from pyspark.sql import SparkSession
+    return (
+        SparkSession.builder
+        .master("local[*]")
+        .appName(app_name)
+        # ein Dokument pro Task, Arrow-Batches klein halten (Docling ist langsam, nicht die Übertragung)
+        .config("spark.sql.execution.arrow.maxRecordsPerBatch", "1")
+        .getOrCreate()
+    )
+
+def ship_modules(spark, module_dir: Optional[Path] = None):
+    """Verteilt die Chunking-Module an die Executors (auf Databricks Repos meist schon im sys.path)."""
+    module_dir = module_dir or Path(__file__).resolve().parent
+    for name in _EXECUTOR_MODULES:
+        spark.sparkContext.addPyFile(str(module_dir / name))
+
+# ---------------- Pfad-DataFrame ----------------
+def build_paths_df(spark, doc_root: Path, num_partitions: Optional[int] = None):
+    # nur auf dem Driver gebraucht -> nicht auf Modulebene importieren (Executors kennen experiments/ nicht)
+    from experiments.chunker_hybrid_unified import discover_docs
+
+    items = discover_docs(doc_root)
+    if not items:
+        raise RuntimeError(f"Keine Dateien unter {doc_root}")
+    df = spark.createDataFrame(
+        [(it["path"], it["ext"], it["doc_type"]) for it in items],
+        "path string, ext string, doc_type string",
+    )
+    # große PDFs nicht auf wenige Partitionen bündeln
+    n = num_partitions or min(len(items), spark.sparkContext.defaultParallelism * 4)
+    return df.repartition(n)
+
+# ---------------- Executor-Seite ----------------
+def chunk_partition(batches: Iterator[Any], gazetteer=None, html_backend: str = "soup") -> Iterator[Any]:
+    """mapInPandas-Funktion: Converter/Tokenizer einmal pro Partition initialisieren."""
+    import pandas as pd
+    from docling.document_converter import DocumentConverter
+    from docling_chunker_functions import (
+        build_pdf_converter, chunk_documents_with_docling,
+        convert_documents_into_docling_doc, return_tokenizer,
+    )
+    from prepare_html_functions import build_docling_from_html
+    from chunk_record_functions import build_chunk_records
+
+    tokenizer = return_tokenizer()
+    pdf_converter = None
+    html_converter = None
+    columns = [c.split()[0] for c in CHUNK_SCHEMA.split(", ")]
+
+    for batch in batches:
+        out: list[Dict[str, Any]] = []
+        for path, ext in zip(batch["path"], batch["ext"]):
+            doc_path = Path(path)
+            try:
+                if ext == ".pdf":
+                    pdf_converter = pdf_converter or build_pdf_converter()
+                    doc = convert_documents_into_docling_doc(doc_path, converter=pdf_converter)
+                else:
+                    html_converter = html_converter or DocumentConverter()
+                    doc = build_docling_from_html(doc_path, converter=html_converter, backend=html_backend)
+                chunker = chunk_documents_with_docling(doc, tokenizer)
+                for rec in build_chunk_records(doc_path, doc, chunker, tokenizer, gazetteer):
+                    rec["source_path"] = path
+                    out.append(rec)
+            except Exception as e:
+                # ein kaputtes Dokument soll nicht den ganzen Job abbrechen
+                print(f"[ERROR] {path}: {e}")
+        if out:
+            yield pd.DataFrame(out, columns=columns)
+
+# ---------------- Driver ----------------
+def ingest_with_spark(
+    spark,
+    doc_root: Path,
+    table_name: Optional[str] = None,
+    out_path: Optional[str] = None,
+    mode: str = "overwrite",
+    num_partitions: Optional[int] = None,
+    html_backend: str = "soup",
+):
+    """
+    Baut das Pfad-DataFrame, chunked verteilt und schreibt die Records
+    direkt in eine Tabelle (table_name) bzw. als JSON (out_path).
+    Gibt das Chunk-DataFrame zurück.
+    """
+    from gazetteer_functions import build_gazetteer
+
+    ship_modules(spark)
+    paths_df = build_paths_df(spark, doc_root, num_partitions)
+    # Gazetteer auf dem Driver bauen (braucht den documents/-Baum), Automat geht mit der Closure mit
+    gazetteer = build_gazetteer(doc_root)
+    chunks_df = paths_df.mapInPandas(
+        partial(chunk_partition, gazetteer=gazetteer, html_backend=html_backend), schema=CHUNK_SCHEMA
+    )
+
+    if table_name:
+        chunks_df.write.mode(mode).saveAsTable(table_name)
+        print(f"[OK] Chunks geschrieben nach Tabelle: {table_name}")
+        return spark.table(table_name)
+    if out_path:
+        chunks_df.write.mode(mode).json(out_path)
+        print(f"[OK] Chunks geschrieben nach: {out_path}")
+        return spark.read.json(out_path)
+    return chunks_df
+
+# ---------------- main ----------------
+def main():
+    import argparse
+    from experiments.chunker_hybrid_unified import resolve_root
+
+    ap = argparse.ArgumentParser(description="Distributed Docling ingestion")
+    ap.add_argument("--doc-root", type=Path, default=None)
+    ap.add_argument("--table", default="docling_chunks")
+    ap.add_argument("--partitions", type=int, default=None)
+    ap.add_argument("--html-backend", default="soup", help="siehe clean_html_functions.BACKENDS")
+    args = ap.parse_args()
+
+    doc_root = args.doc_root or (resolve_root() / "documents")
+    if not doc_root.exists():
+        raise RuntimeError(f"documents-Ordner nicht gefunden: {doc_root}")
+
+    spark = get_local_spark()
+    df = ingest_with_spark(spark, doc_root, table_name=args.table, num_partitions=args.partitions,
+                           html_backend=args.html_backend)
+    print(f"✅ {df.count()} chunks → {args.table}")
+
+if __name__ == "__main__":
+    main()
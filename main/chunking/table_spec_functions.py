@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Spec-Tabellen aus Docling-Dokumenten extrahieren und in einem indizierten Store ablegen.
+
+clean_text() entfernt Markdown-Tabellenzeilen aus den Chunks – die Tabellen selbst
+gehen hier direkt aus doc.tables (TableItem-Grid) in eine SQLite-Tabelle mit
+Index auf (product, parameter_key). Spec-Fragen ("operating voltage Nano 33 BLE")
+sind dann ein Index-Lookup statt Retrieval + LLM.
+"""
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# ---------------- Normalisierung ----------------
+UNIT_MAP = {
+    "v": "V", "mv": "mV", "a": "A", "ma": "mA", "ua": "µA", "µa": "µA",
+    "hz": "Hz", "khz": "kHz", "mhz": "MHz", "ghz": "GHz",
+    "kb": "KB", "mb": "MB", "gb": "GB", "kbit": "Kbit", "mbit": "Mbit",
+    "°c": "°C", "c": "°C", "w": "W", "mw": "mW", "mm": "mm", "g": "g", "ms": "ms", "us": "µs",
+}
+
+# Spaltenüberschrift -> Rolle
+HEADER_ROLES = {
+    "parameter": "parameter", "parameters": "parameter", "feature": "parameter", "features": "parameter",
+    "characteristic": "parameter", "characteristics": "parameter", "name": "parameter",
+    "component": "parameter", "item": "parameter", "property": "parameter",
+    "description": "text", "specification": "text", "details": "text",
+    "symbol": "symbol",
+    "min": "min", "minimum": "min",
+    "typ": "typ", "typical": "typ", "nom": "typ", "nominal": "typ",
+    "max": "max", "maximum": "max",
+    "value": "value", "rating": "value",
+    "unit": "unit", "units": "unit",
+}
+
+# Pinout-Tabellen ("Pin | Name | Function") enthalten keine Spezifikationen
+PINOUT_HEADERS = {"pin", "pin number", "pin no", "pin no.", "pin #", "pins"}
+
+# Synonyme für häufig gefragte Parameter (parameter_key -> kanonischer Key)
+PARAMETER_ALIASES = {
+    "operating voltage": "operating voltage",
+    "circuit operating voltage": "operating voltage",
+    "i/o voltage": "operating voltage",
+    "input voltage": "input voltage",
+    "input voltage (nominal)": "input voltage",
+    "vin": "input voltage",
+    "clock speed": "clock speed",
+    "clock frequency": "clock speed",
+    "cpu frequency": "clock speed",
+    "digital i/o pins": "digital i/o pins",
+    "digital pins": "digital i/o pins",
+    "analog input pins": "analog input pins",
+    "analog inputs": "analog input pins",
+    "pwm pins": "pwm pins",
+    "flash memory": "flash memory",
+    "flash": "flash memory",
+    "sram": "sram",
+}
+
+NUM_UNIT_RE = re.compile(r"^\s*([-+]?\d+(?:[.,]\d+)?)\s*([a-zA-Zµ°Ω%/]+)?\s*$")
+# reine Nummern ("1", "12", "3.1") sind Pin-/Zeilennummern, keine Parameter
+PIN_NUMBER_RE = re.compile(r"[\d\s.,/-]+")
+
+def normalize_unit(u: Optional[str]) -> str:
+    if not u:
+        return ""
+    u = u.strip()
+    return UNIT_MAP.get(u.lower(), u)
+
+def normalize_parameter(name: str) -> str:
+    s = (name or "").strip().lower()
+    s = re.sub(r"\[\d+\]|\(\d+\)|\*+", "", s)  # Fußnoten
+    s = re.sub(r"\s+", " ", s).strip(" :.-")
+    return PARAMETER_ALIASES.get(s, s)
+
+def parse_value(text: str):
+    """'3.3V' -> (3.3, 'V'); nicht-numerische Werte -> (None, '')."""
+    m = NUM_UNIT_RE.match(text or "")
+    if not m:
+        return None, ""
+    return float(m.group(1).replace(",", ".")), normalize_unit(m.group(2))
+
+# ---------------- Extraktion ----------------
+def table_grid_texts(table) -> List[List[str]]:
+    grid = getattr(getattr(table, "data", None), "grid", None) or []
+    return [[(getattr(c, "text", "") or "").strip() for c in row] for row in grid]
+
+def header_roles(header: List[str]) -> List[Optional[str]]:
+    """
+    Rollen pro Spalte. "Description"/"Specification"/"Details" ("text") sind in den
+    Datenblättern meist die Wert-Spalte ("Feature | Description", "| Description",
+    "Characteristics | Specification"); Parameter nur in "Symbol | Description | Min | Typ | Max".
+    """
+    roles = [HEADER_ROLES.get(c.lower().strip(" :"), None) for c in header]
+    has_numbers = any(r in roles for r in ("value", "min", "typ", "max"))
+    for i, role in enumerate(roles):
+        if role != "text":
+            continue
+        if has_numbers:
+            roles[i] = None if "parameter" in roles else "parameter"
+        elif "parameter" in roles:
+            roles[i] = "value"
+        else:
+            # Parameter-Spalte ohne Überschrift links davon ("| Description")
+            free = [j for j in range(i) if roles[j] is None]
+            if free:
+                roles[free[0]] = "parameter"
+                roles[i] = "value"
+            else:
+                roles[i] = "parameter"
+    return roles
+
+def _header_index(table, rows: List[List[str]]) -> int:
+    grid = table.data.grid
+    for i, row in enumerate(grid[:3]):
+        if any(getattr(c, "column_header", False) for c in row):
+            return i
+    # Fallback: erste Zeile, wenn sie Rollen-Namen enthält
+    if rows and any(h.lower() in HEADER_ROLES for h in rows[0]):
+        return 0
+    return -1
+
+def extract_spec_rows(doc, product: str, category: str, source: str) -> List[Dict[str, Any]]:
+    """Normalisiert alle Tabellen eines DoclingDocument zu Spec-Zeilen (parameter/value/unit)."""
+    out: List[Dict[str, Any]] = []
+    for t_idx, table in enumerate(getattr(doc, "tables", None) or []):
+        rows = table_grid_texts(table)
+        if not rows or max(len(r) for r in rows) < 2:
+            continue
+
+        h = _header_index(table, rows)
+        if h >= 0:
+            if any(c.lower().strip(" :") in PINOUT_HEADERS for c in rows[h]):
+                continue
+            roles = header_roles(rows[h])
+            body = rows[h + 1:]
+        else:
+            # zweispaltige Tabelle ohne Header: "Microcontroller | nRF52840"
+            roles = ["parameter", "value"] + [None] * (len(rows[0]) - 2)
+            body = rows
+        # keine Parameter-Spalte im Header (z. B. Pin-Tabellen) -> nur übernehmen, wenn Zahlenwerte drin sind
+        guessed = "parameter" not in roles
+        if guessed:
+            free = [i for i, r in enumerate(roles) if r is None]
+            roles[free[0] if free else 0] = "parameter"
+        if not any(r in roles for r in ("value", "min", "typ", "max")):
+            free = [i for i, r in enumerate(roles) if r is None]
+            if not free:
+                continue
+            roles[free[0]] = "value"
+
+        prov = getattr(table, "prov", None) or []
+        page = getattr(prov[0], "page_no", None) if prov else None
+
+        table_rows: List[Dict[str, Any]] = []
+        for row in body:
+            cells = {role: row[i] for i, role in enumerate(roles) if role and i < len(row)}
+            param = cells.get("parameter", "")
+            if not param or param.lower() in HEADER_ROLES or PIN_NUMBER_RE.fullmatch(param):
+                continue
+            unit = normalize_unit(cells.get("unit"))
+            nums = {}
+            for role in ("min", "typ", "max"):
+                v, u = parse_value(cells.get(role, ""))
+                nums[role] = v
+                unit = unit or u
+            value_text = cells.get("value") or " / ".join(
+                cells[r] for r in ("min", "typ", "max") if cells.get(r)
+            )
+            if not value_text:
+                continue
+            if nums["typ"] is None and cells.get("value"):
+                nums["typ"], u = parse_value(cells["value"])
+                unit = unit or u
+            table_rows.append({
+                "product": product,
+                "category": category,
+                "parameter": param,
+                "parameter_key": normalize_parameter(param),
+                "symbol": cells.get("symbol"),
+                "value_min": nums["min"],
+                "value_typ": nums["typ"],
+                "value_max": nums["max"],
+                "value_text": value_text,
+                "unit": unit,
+                "source": source,
+                "table_index": t_idx,
+                "page": page,
+            })
+        if guessed and not any(
+            r[k] is not None for r in table_rows for k in ("value_min", "value_typ", "value_max")
+        ):
+            continue
+        out.extend(table_rows)
+    return out
+
+# ---------------- Spec Store ----------------
+SPEC_COLUMNS = [
+    "product", "category", "parameter", "parameter_key", "symbol",
+    "value_min", "value_typ", "value_max", "value_text", "unit",
+    "source", "table_index", "page",
+]
+
+class SpecStore:
+    """SQLite-Store für Spec-Zeilen, Index auf (product, parameter_key)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path))
+        self.con.row_factory = sqlite3.Row
+        self.con.executescript("""
+        CREATE TABLE IF NOT EXISTS specs (
+            id INTEGER PRIMARY KEY,
+            product TEXT NOT NULL, category TEXT, parameter TEXT NOT NULL,
+            parameter_key TEXT NOT NULL, symbol TEXT,
+            value_min REAL, value_typ REAL, value_max REAL, value_text TEXT, unit TEXT,
+            source TEXT, table_index INTEGER, page INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_specs_product_param ON specs(product COLLATE NOCASE, parameter_key);
+        CREATE INDEX IF NOT EXISTS idx_specs_param ON specs(parameter_key);
+        CREATE INDEX IF NOT EXISTS idx_specs_source ON specs(source);
+        """)
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]], source: Optional[str] = None,
+                 replace_source: bool = True) -> int:
+        """
+        source = Dokument, dessen alte Zeilen ersetzt werden – auch wenn die neue
+        Extraktion 0 Zeilen liefert (sonst blieben veraltete Zeilen stehen).
+        """
+        rows = list(rows)
+        sources = {r["source"] for r in rows} | ({source} if source else set())
+        if not sources:
+            return 0
+        with self.con:
+            if replace_source:
+                # Re-Ingestion desselben Dokuments ersetzt dessen Zeilen
+                for src in sources:
+                    self.con.execute("DELETE FROM specs WHERE source = ?", (src,))
+            self.con.executemany(
+                f"INSERT INTO specs ({', '.join(SPEC_COLUMNS)}) VALUES ({', '.join('?' * len(SPEC_COLUMNS))})",
+                [tuple(r.get(c) for c in SPEC_COLUMNS) for r in rows],
+            )
+        return len(rows)
+
+    def lookup(self, product: str, parameter: str) -> List[Dict[str, Any]]:
+        """Direkter Index-Lookup; fällt auf Präfix-Suche über parameter_key zurück."""
+        key = normalize_parameter(parameter)
+        cur = self.con.execute(
+            "SELECT * FROM specs WHERE product = ? COLLATE NOCASE AND parameter_key = ?",
+            (product, key),
+        )
+        rows = [dict(r) for r in cur]
+        if rows:
+            return rows
+        cur = self.con.execute(
+            "SELECT * FROM specs WHERE product = ? COLLATE NOCASE AND parameter_key >= ? AND parameter_key < ?",
+            (product, key, key + "￿"),
+        )
+        return [dict(r) for r in cur]
+
+    def products_with(self, parameter: str) -> List[Dict[str, Any]]:
+        cur = self.con.execute(
+            "SELECT * FROM specs WHERE parameter_key = ? ORDER BY product", (normalize_parameter(parameter),)
+        )
+        return [dict(r) for r in cur]
+
+    def close(self):
+        self.con.close()
+
+def format_spec_answer(rows: List[Dict[str, Any]]) -> Optional[str]:
+    if not rows:
+        return None
+    parts = []
+    for r in rows:
+        rng = [f"{k}={r[f'value_{k}']:g}" for k in ("min", "typ", "max") if r.get(f"value_{k}") is not None]
+        val = ", ".join(rng) if len(rng) > 1 else r["value_text"]
+        unit = r["unit"] or ""
+        if unit and val.endswith(unit):
+            unit = ""
+        parts.append(f"{r['parameter']}: {val} {unit}".strip())
+    return f"[{rows[0]['product']}] " + "; ".join(dict.fromkeys(parts))
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Delta-Sync: Chunk-Output (out/*/docling_chunks.jsonl) -> Neo4j, ohne Full-Rebuild.
+
+Statt "MATCH (n:Document) DETACH DELETE n" + Neu-Laden wird über chunk_id und
+einen Content-Hash gediffed:
+  - neue/geänderte Chunks  -> Document-Knoten upserten
+  - entfernte Chunks       -> Document-Knoten löschen
+  - abgeleitete Kanten (SUPPORTS_INTERFACE, HAS_SPEC, CANDIDATE_USES) werden nur für
+    die betroffenen Chunks neu berechnet; r.evidence bleibt konsistent (IDs raus,
+    Kante weg, wenn evidence leer ist)
+
+    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "testmaster123"))
+    summary = sync_chunks(driver, out_dir)             # dry_run=True zeigt nur den Diff
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# ---------------- Regeln (wie in kg_first_test.ipynb) ----------------
+INTERFACES = {"i2c", "spi", "uart", "pwm", "analog", "digital", "can", "ethernet", "usb", "wifi", "bluetooth", "ble"}
+SPEC_PATTERNS = [
+    r"(operating voltage)\s*[:\-]?\s*([\d\.,]+)\s*([a-zA-Z°]+)?",
+    r"(input voltage)\s*[:\-]?\s*([\d\.,]+)\s*([a-zA-Z°]+)?",
+    r"(clock(?: speed)?)\s*[:\-]?\s*([\d\.,]+)\s*(mhz|khz|hz)",
+    r"(analog inputs?)\s*[:\-]?\s*([\d]+)",
+    r"(digital (?:i\/o|pins?))\s*[:\-]?\s*([\d]+)",
+]
+_IFACE_RES = {i: re.compile(rf"\b{re.escape(i)}\b") for i in INTERFACES}
+_SPEC_RES = [re.compile(p, re.IGNORECASE) for p in SPEC_PATTERNS]
+
+# Felder, die in den Document-Knoten gehen (und den Hash bestimmen)
+DOC_FIELDS = ("text", "product", "category", "chunk_type", "section", "element", "tutorial", "page", "source",
+              "mentions", "mention_kinds")
+DERIVED_RELS = ("SUPPORTS_INTERFACE", "HAS_SPEC", "CANDIDATE_USES")
+BATCH = 500
+
+# ---------------- Chunks lesen / hashen ----------------
+def load_chunk_records(out_dir: Path) -> Dict[str, Dict[str, Any]]:
+    records: Dict[str, Dict[str, Any]] = {}
+    for path in sorted(Path(out_dir).glob("*/docling_chunks.jsonl")):
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                v = json.loads(line)
+                cid = v.get("chunk_id") or v.get("id")
+                if cid:
+                    records[cid] = v  # gleiche ID später in der Datei gewinnt (wie MERGE ... SET)
+    return records
+
+def content_hash(rec: Dict[str, Any]) -> str:
+    payload = json.dumps({k: rec.get(k) for k in DOC_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _capitalize_all(s: str) -> str:
+    # wie apoc.text.capitalizeAll: nur den ersten Buchstaben jedes Worts anfassen
+    return " ".join(w[:1].upper() + w[1:] for w in s.split(" "))
+
+# ---------------- Ableitungen pro Chunk ----------------
+def derive_interfaces(text: str) -> List[str]:
+    low = (text or "").lower()
+    return sorted(i.upper() for i, rx in _IFACE_RES.items() if rx.search(low))
+
+def derive_specs(product: str, text: str) -> List[Dict[str, str]]:
+    out = {}
+    for rx in _SPEC_RES:
+        for m in rx.finditer(text or ""):
+            k = _capitalize_all(m.group(1).strip())
+            v = m.group(2).strip()
+            u = (m.group(3) if m.lastindex and m.lastindex >= 3 else None) or ""
+            u = u.strip()
+            sid = f"{product}:{k}:{v}:{u}"
+            out[sid] = {"id": sid, "key": k, "value": v, "unit": u}
+    return list(out.values())
+
+# ---------------- Diff ----------------
+def diff_chunks(records: Dict[str, Dict[str, Any]], graph_hashes: Dict[str, Optional[str]]):
+    new, changed, unchanged = [], [], []
+    for cid, rec in records.items():
+        h = content_hash(rec)
+        if cid not in graph_hashes:
+            new.append(cid)
+        elif graph_hashes[cid] != h:
+            changed.append(cid)  # auch Altbestand ohne content_hash -> einmalig neu schreiben
+        else:
+            unchanged.append(cid)
+    removed = [cid for cid in graph_hashes if cid not in records]
+    return new, changed, unchanged, removed
+
+def mention_pairs(rec: Dict[str, Any]) -> List[Dict[str, str]]:
+    """mentions + mention_kinds -> [{"name", "kind"}]; ältere Records ohne kinds -> part_number."""
+    names = rec.get("mentions") or []
+    kinds = rec.get("mention_kinds") or []
+    return [{"name": n, "kind": kinds[i] if i < len(kinds) else "part_number"} for i, n in enumerate(names)]
+
+def _batches(rows: List[Any], n: int = BATCH) -> Iterable[List[Any]]:
+    for i in range(0, len(rows), n):
+        yield rows[i:i + n]
+
+# ---------------- Cypher ----------------
+FETCH_HASHES = "MATCH (d:Document) RETURN d.id AS id, d.content_hash AS h"
+
+# evidence der betroffenen Chunks aus allen abgeleiteten Kanten entfernen, leere Kanten löschen
+STRIP_EVIDENCE = """
+UNWIND $ids AS cid
+MATCH (:Product)-[r]->()
+WHERE type(r) IN $rels AND cid IN coalesce(r.evidence, [])
+WITH DISTINCT r
+SET r.evidence = [e IN r.evidence WHERE NOT e IN $ids]
+WITH r WHERE size(r.evidence) = 0
+DELETE r
+"""
+
+DELETE_DOCS = """
+UNWIND $ids AS cid
+MATCH (d:Document {id: cid})
+DETACH DELETE d
+"""
+
+UPSERT_DOCS = """
+UNWIND $rows AS v
+MERGE (d:Document {id: v.id})
+SET d.text         = v.text,
+    d.product      = v.product,
+    d.category     = v.category,
+    d.doc_type     = v.chunk_type,
+    d.source       = v.source,
+    d.page         = v.page,
+    d.section      = v.section,
+    d.element      = v.element,
+    d.tutorial     = v.tutorial,
+    d.mentions     = coalesce(v.mentions, [])
+WITH DISTINCT d, v
+// Produktwechsel eines Chunks: alte Zuordnung lösen
+OPTIONAL MATCH (old:Product)-[od:DESCRIBED_IN]->(d)
+WHERE old.name <> v.product
+DELETE od
+WITH DISTINCT d, v WHERE v.product IS NOT NULL AND v.category IS NOT NULL
+MERGE (c:Category {name: v.category})
+MERGE (p:Product  {name: v.product})
+MERGE (p)-[:BELONGS_TO]->(c)
+MERGE (p)-[:DESCRIBED_IN]->(d)
+"""
+
+# Gazetteer-Erwähnungen (chunking/gazetteer_functions.py) -> Document-[:MENTIONS]->...
+# je nach kind auf den vorhandenen Knoten: product -> Product, family -> Category,
+# component -> Component, sonst (mehrdeutige/unbekannte Artikelnummer) -> Entity
+MERGE_MENTIONS = """
+UNWIND $rows AS v
+MATCH (d:Document {id: v.id})
+OPTIONAL MATCH (d)-[old:MENTIONS]->()
+DELETE old
+WITH DISTINCT d, v
+UNWIND v.mentions AS m
+FOREACH (_ IN CASE WHEN m.kind = 'product' THEN [1] ELSE [] END |
+  MERGE (e:Product {name: m.name}) MERGE (d)-[:MENTIONS]->(e))
+FOREACH (_ IN CASE WHEN m.kind = 'family' THEN [1] ELSE [] END |
+  MERGE (e:Category {name: m.name}) MERGE (d)-[:MENTIONS]->(e))
+FOREACH (_ IN CASE WHEN m.kind = 'component' THEN [1] ELSE [] END |
+  MERGE (e:Component {name: m.name}) MERGE (d)-[:MENTIONS]->(e))
+FOREACH (_ IN CASE WHEN NOT m.kind IN ['product', 'family', 'component'] THEN [1] ELSE [] END |
+  MERGE (e:Entity {name: m.name})
+  ON CREATE SET e.source = 'gazetteer', e.kind = m.kind
+  MERGE (d)-[:MENTIONS]->(e))
+"""
+
+MERGE_INTERFACES = """
+UNWIND $rows AS row
+MATCH (p:Product {name: row.product})
+MERGE (i:Interface {name: row.iface})
+MERGE (p)-[r:SUPPORTS_INTERFACE]->(i)
+ON CREATE SET r.source='text_rule', r.confidence=0.8, r.evidence=row.cids
+ON MATCH  SET r.evidence=apoc.coll.toSet(coalesce(r.evidence,[]) + row.cids),
+             r.confidence=CASE WHEN r.confidence<0.8 THEN 0.8 ELSE r.confidence END
+"""
+
+MERGE_SPECS = """
+UNWIND $rows AS row
+MATCH (p:Product {name: row.product})
+MERGE (s:Spec {id: row.id})
+ON CREATE SET s.key = row.key, s.value = row.value, s.unit = row.unit
+MERGE (p)-[r:HAS_SPEC]->(s)
+ON CREATE SET r.source='text_rule', r.evidence=row.cids
+ON MATCH  SET r.evidence=apoc.coll.toSet(coalesce(r.evidence,[]) + row.cids)
+"""
+
+MERGE_COMPONENTS = """
+UNWIND $rows AS row
+MATCH (p:Product {name: row.product})
+MERGE (c:Component {name: row.comp})
+MERGE (p)-[r:CANDIDATE_USES]->(c)
+ON CREATE SET r.source=row.source, r.confidence=row.confidence, r.evidence=row.cids
+ON MATCH  SET r.evidence=apoc.coll.toSet(coalesce(r.evidence,[]) + row.cids),
+             r.confidence=CASE WHEN r.confidence<row.confidence THEN row.confidence ELSE r.confidence END
+"""
+
+# Hash erst ganz zum Schluss: bricht der Sync vorher ab, gilt der Chunk beim nächsten Lauf
+# weiter als geändert und seine abgeleiteten Kanten werden neu aufgebaut
+SET_HASHES = """
+UNWIND $rows AS v
+MATCH (d:Document {id: v.id})
+SET d.content_hash = v.hash
+"""
+
+DROP_ORPHANS = """
+MATCH (n) WHERE (n:Interface OR n:Spec OR n:Component OR (n:Entity AND n.source = 'gazetteer'))
+  AND NOT (n)--()
+DELETE n
+"""
+
+# ---------------- Sync ----------------
+def _group(rows: Iterable[Tuple], keys: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """(product, x..., cid)-Tupel -> eine Zeile pro (product, x...) mit cids-Liste."""
+    grouped: Dict[Tuple, List[str]] = {}
+    for *k, cid in rows:
+        grouped.setdefault(tuple(k), []).append(cid)
+    return [{**dict(zip(keys, k)), "cids": sorted(set(c))} for k, c in grouped.items()]
+
+def gazetteer_components(rec: Dict[str, Any]) -> List[str]:
+    """Standard-component_fn: Bauteil-Treffer des Gazetteers (mention_kinds == "component")."""
+    return [m["name"] for m in mention_pairs(rec) if m["kind"] == "component"]
+
+def sync_chunks(
+    driver,
+    out_dir: Path,
+    component_fn: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None,
+    component_source: str = "delta_sync",
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Diff Chunk-Output vs. Graph und schreibt nur das Delta.
+    component_fn(record) -> Komponentennamen für CANDIDATE_USES (z. B. gazetteer_components
+    oder spaCy-Tagging); ohne component_fn bleiben vorhandene CANDIDATE_USES-Kanten unangetastet.
+    """
+    records = load_chunk_records(out_dir)
+    with driver.session() as s:
+        graph_hashes = {r["id"]: r["h"] for r in s.run(FETCH_HASHES)}
+    new, changed, unchanged, removed = diff_chunks(records, graph_hashes)
+    summary = {"new": len(new), "changed": len(changed), "unchanged": len(unchanged), "removed": len(removed)}
+    if dry_run:
+        return {**summary, "dry_run": True}
+
+    # ohne component_fn keine evidence aus CANDIDATE_USES streichen, die nicht neu aufgebaut wird
+    rels = [r for r in DERIVED_RELS if component_fn is not None or r != "CANDIDATE_USES"]
+    affected = changed + removed
+    upsert = new + changed
+    iface_rows, spec_rows, comp_rows = [], [], []
+    for cid in upsert:
+        rec = records[cid]
+        product, text = rec.get("product"), rec.get("text") or ""
+        if not product:
+            continue
+        iface_rows += [(product, i, cid) for i in derive_interfaces(text)]
+        for sp in derive_specs(product, text):
+            spec_rows.append((product, sp["id"], sp["key"], sp["value"], sp["unit"], cid))
+        if component_fn is not None:
+            comp_rows += [(product, c, cid) for c in component_fn(rec)]
+
+    with driver.session() as s:
+        # 1) alte evidence der geänderten/entfernten Chunks raus
+        for ids in _batches(affected):
+            s.run(STRIP_EVIDENCE, ids=ids, rels=rels)
+        # 2) entfernte Chunks löschen
+        for ids in _batches(removed):
+            s.run(DELETE_DOCS, ids=ids)
+        # 3) neue/geänderte Document-Knoten upserten
+        doc_rows = [
+            {
+                "id": cid, "hash": content_hash(records[cid]),
+                "source": records[cid].get("source") or records[cid].get("path"),
+                **{k: records[cid].get(k) for k in DOC_FIELDS if k != "source"},
+            }
+            for cid in upsert
+        ]
+        for rows in _batches(doc_rows):
+            s.run(UPSERT_DOCS, rows=rows)
+            s.run(MERGE_MENTIONS, rows=[{"id": r["id"], "mentions": mention_pairs(r)} for r in rows])
+        # 4) abgeleitete Kanten nur für diese Chunks neu berechnen
+        for rows in _batches(_group(iface_rows, ("product", "iface"))):
+            s.run(MERGE_INTERFACES, rows=rows)
+        for rows in _batches(_group(spec_rows, ("product", "id", "key", "value", "unit"))):
+            s.run(MERGE_SPECS, rows=rows)
+        comp = [{**r, "source": component_source, "confidence": 0.7} for r in _group(comp_rows, ("product", "comp"))]
+        for rows in _batches(comp):
+            s.run(MERGE_COMPONENTS, rows=rows)
+        # 5) erst jetzt content_hash setzen -> Chunk gilt als vollständig synchronisiert
+        for rows in _batches([{"id": r["id"], "hash": r["hash"]} for r in doc_rows]):
+            s.run(SET_HASHES, rows=rows)
+        # 6) Interface/Spec/Component ohne Kanten aufräumen
+        if affected:
+            s.run(DROP_ORPHANS)
+
+    summary.update({"interface_edges": len(iface_rows), "spec_edges": len(spec_rows), "component_edges": len(comp_rows)})
+    print(f"[OK] Delta-Sync: {summary}")
+    return {**summary, "new_ids": new}
+
+def refresh_snapshot(driver, snapshot_dir: Path, summary: Dict[str, Any]):
+    """
+    Hält den CSR-Snapshot (graph_snapshot.py) aktuell. Kamen nur Chunks hinzu, werden
+    die Kanten ihrer Produkte per add_edges nachgetragen (bekannte Kanten überspringt
+    add_edges). Geänderte/entfernte Chunks können Kanten löschen -> Neuexport.
+    """
+    from graph_snapshot import GraphSnapshot, _key_expr, export_from_neo4j
+    snapshot_dir = Path(snapshot_dir)
+    if summary.get("removed") or summary.get("changed") or not GraphSnapshot.exists(snapshot_dir):
+        return export_from_neo4j(driver, snapshot_dir)
+    snap = GraphSnapshot.open(snapshot_dir)
+    if not summary.get("new_ids"):
+        return snap
+    with driver.session() as s:
+        # Produkt-Kanten (DESCRIBED_IN, abgeleitete Kanten) + Kanten der Documents selbst (MENTIONS)
+        edges = s.run(f"""
+        MATCH (d:Document) WHERE d.id IN $ids
+        MATCH (p:Product)-[:DESCRIBED_IN]->(d)
+        MATCH (p)-[r]->(m)
+        RETURN DISTINCT labels(p)[0] AS sl, {_key_expr("p")} AS sk, type(r) AS t, labels(m)[0] AS dl, {_key_expr("m")} AS dk
+        UNION
+        MATCH (d:Document) WHERE d.id IN $ids
+        MATCH (d)-[r]->(m)
+        RETURN DISTINCT labels(d)[0] AS sl, {_key_expr("d")} AS sk, type(r) AS t, labels(m)[0] AS dl, {_key_expr("m")} AS dk
+        """, ids=summary["new_ids"]).values()
+    snap.add_edges(tuple(e) for e in edges)
+    return snap
+
+def main():
+    import argparse
+    from neo4j import GraphDatabase
+
+    ap = argparse.ArgumentParser(description="Delta sync chunk output -> Neo4j")
+    ap.add_argument("--out-dir", type=Path, default=Path(__file__).resolve().parent.parent / "out")
+    ap.add_argument("--uri", default="bolt://localhost:7687")
+    ap.add_argument("--user", default="neo4j")
+    ap.add_argument("--password", default="testmaster123")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--snapshot-dir", type=Path, default=None)
+    ap.add_argument("--no-components", action="store_true",
+                    help="CANDIDATE_USES nicht anfassen (sonst aus den Gazetteer-Treffern neu aufbauen)")
+    args = ap.parse_args()
+
+    driver = GraphDatabase.driver(args.uri, auth=(args.user, args.password))
+    component_fn = None if args.no_components else gazetteer_components
+    summary = sync_chunks(driver, args.out_dir, component_fn=component_fn,
+                          component_source="gazetteer", dry_run=args.dry_run)
+    if args.snapshot_dir and not args.dry_run:
+        refresh_snapshot(driver, args.snapshot_dir, summary)
+    driver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+In-Process-Snapshot des Neo4j-Graphen (Product/Interface/Spec/Component/Document ...)
+als CSR-Adjazenz mit Integer-IDs. Die Arrays liegen als .npy auf Platte und werden
+per mmap geöffnet, k-Hop-Expansion läuft ohne Cypher-Roundtrip.
+
+    snap = export_from_neo4j(driver, out_dir)          # einmalig / nach Full-Rebuild
+    snap = GraphSnapshot.open(out_dir)                  # im Retriever
+    pid = snap.node_id("Product", "Portenta C33")
+    hits = snap.k_hop([pid], k=2, edge_types=["SUPPORTS_INTERFACE", "HAS_SPEC"])
+
+Neue Kanten aus dem Graph-Loader gehen über add_edges() in ein Delta-Log
+(delta.jsonl) und werden bei Bedarf per compact() in die CSR-Arrays gemerged.
+
+Layout: out_dir/CURRENT nennt das aktive Versionsverzeichnis (out_dir/v000003-<ns>/
+mit .npy, meta.json, delta.jsonl). Neue Versionen werden komplett geschrieben, dann
+wird CURRENT per os.replace getauscht -> Leser sehen immer eine vollständige Version.
+Offene Snapshots prüfen bei Lookups (höchstens alle REFRESH_CHECK_S) CURRENT und die
+Größe von delta.jsonl und übernehmen neue Kanten anderer Prozesse (refresh()).
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (label, key) identifiziert einen Knoten stabil über Snapshots hinweg
+NodeKey = Tuple[str, str]
+# (src_label, src_key, edge_type, dst_label, dst_key)
+EdgeRow = Tuple[str, str, str, str, str]
+
+COMPACT_THRESHOLD = 10_000  # Delta-Kanten, ab denen add_edges() automatisch kompaktiert
+REFRESH_CHECK_S = 1.0       # wie oft Lookups auf neue Version / neue Delta-Zeilen prüfen
+KEEP_VERSIONS = 2           # alte Versionsverzeichnisse, die für noch öffnende Leser stehen bleiben
+
+# ---------------- CSR-Aufbau ----------------
+def _build_csr(n_nodes: int, src: np.ndarray, dst: np.ndarray, et: np.ndarray):
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), et[order].astype(np.int16)
+
+def _save_arrays(path: Path, **arrays):
+    for name, arr in arrays.items():
+        np.save(path / f"{name}.npy", arr)
+
+def _current_dir(path: Path) -> Path:
+    """Aktives Versionsverzeichnis; ohne CURRENT (altes, flaches Layout) path selbst."""
+    pointer = path / "CURRENT"
+    if pointer.exists():
+        return path / pointer.read_text(encoding="utf-8").strip()
+    return path
+
+class GraphSnapshot:
+    def __init__(self, path: Path, nodes: List[NodeKey], edge_types: List[str],
+                 out_csr, in_csr, version: int = 0, data_dir: Optional[Path] = None):
+        self.path = Path(path)
+        self.data_dir = Path(data_dir) if data_dir is not None else self.path
+        self.nodes = nodes
+        self.edge_types = edge_types
+        self.version = version
+        self.out_indptr, self.out_indices, self.out_etypes = out_csr
+        self.in_indptr, self.in_indices, self.in_etypes = in_csr
+        self._node_index: Dict[NodeKey, int] = {k: i for i, k in enumerate(nodes)}
+        self._etype_index: Dict[str, int] = {t: i for i, t in enumerate(edge_types)}
+        # Delta (noch nicht kompaktiert): node -> [(nbr, etype)]
+        self._delta_out: Dict[int, List[Tuple[int, int]]] = {}
+        self._delta_in: Dict[int, List[Tuple[int, int]]] = {}
+        self._n_csr_nodes = len(self.out_indptr) - 1
+        self._delta_offset = 0  # bis hierhin ist delta.jsonl angewendet
+        self._last_check = time.monotonic()
+
+    # ---------------- Build / IO ----------------
+    @classmethod
+    def build(cls, path: Path, edges: Iterable[EdgeRow], nodes: Iterable[NodeKey] = ()) -> "GraphSnapshot":
+        """Baut den Snapshot aus Kantenzeilen (+ optional isolierten Knoten) und schreibt ihn nach path."""
+        node_index: Dict[NodeKey, int] = {}
+        etype_index: Dict[str, int] = {}
+        for n in nodes:
+            node_index.setdefault(tuple(n), len(node_index))
+        src, dst, et = [], [], []
+        for sl, sk, t, dl, dk in edges:
+            s = node_index.setdefault((sl, sk), len(node_index))
+            d = node_index.setdefault((dl, dk), len(node_index))
+            src.append(s); dst.append(d)
+            et.append(etype_index.setdefault(t, len(etype_index)))
+
+        n = len(node_index)
+        src_a = np.asarray(src, dtype=np.int64)
+        dst_a = np.asarray(dst, dtype=np.int64)
+        et_a = np.asarray(et, dtype=np.int64)
+        out_csr = _build_csr(n, src_a, dst_a, et_a)
+        in_csr = _build_csr(n, dst_a, src_a, et_a)
+
+        nodes_list = [None] * n
+        for k, i in node_index.items():
+            nodes_list[i] = k
+        etypes_list = [None] * len(etype_index)
+        for t, i in etype_index.items():
+            etypes_list[i] = t
+
+        snap = cls(path, nodes_list, etypes_list, out_csr, in_csr)
+        snap._write(Path(path))
+        return cls.open(path)
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (_current_dir(Path(path)) / "meta.json").exists()
+
+    def _write(self, path: Path):
+        # neues Versionsverzeichnis schreiben, dann nur den CURRENT-Zeiger atomar tauschen:
+        # path existiert durchgehend, offene mmaps anderer Prozesse bleiben gültig
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        name = f"v{self.version:06d}-{time.time_ns()}"
+        tmp = path / (name + ".tmp")
+        tmp.mkdir()
+        _save_arrays(
+            tmp,
+            out_indptr=self.out_indptr, out_indices=self.out_indices, out_etypes=self.out_etypes,
+            in_indptr=self.in_indptr, in_indices=self.in_indices, in_etypes=self.in_etypes,
+        )
+        meta = {"version": self.version, "nodes": [list(k) for k in self.nodes], "edge_types": self.edge_types}
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path / name)
+        pointer_tmp = path / f"CURRENT.{os.getpid()}.tmp"
+        pointer_tmp.write_text(name, encoding="utf-8")
+        os.replace(pointer_tmp, path / "CURRENT")
+        self._prune(path, name)
+
+    @staticmethod
+    def _prune(path: Path, current: str):
+        # nur ältere Versionen löschen; die letzten KEEP_VERSIONS bleiben für Leser, die gerade öffnen
+        versions = sorted((p for p in path.glob("v*-*") if p.is_dir() and not p.name.endswith(".tmp")
+                           and p.name != current),
+                          key=lambda p: int(p.name.rsplit("-", 1)[-1]))  # Schreibzeitpunkt, nicht Version (Rebuild startet bei 0)
+        for old in versions[:max(0, len(versions) - KEEP_VERSIONS)]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def open(cls, path: Path) -> "GraphSnapshot":
+        path = Path(path)
+        data_dir = _current_dir(path)  # Zeiger einmal lesen, danach nur noch diese Version
+        meta = json.loads((data_dir / "meta.json").read_text(encoding="utf-8"))
+        load = lambda name: np.load(data_dir / f"{name}.npy", mmap_mode="r")
+        snap = cls(
+            path,
+            [tuple(k) for k in meta["nodes"]],
+            meta["edge_types"],
+            (load("out_indptr"), load("out_indices"), load("out_etypes")),
+            (load("in_indptr"), load("in_indices"), load("in_etypes")),
+            version=meta.get("version", 0),
+            data_dir=data_dir,
+        )
+        snap._replay_delta()
+        return snap
+
+    def refresh(self) -> bool:
+        """
+        Übernimmt Änderungen anderer Prozesse: neue Version (CURRENT) -> neu öffnen,
+        sonst nur die neuen Zeilen aus delta.jsonl anwenden. True, wenn die Version
+        gewechselt hat (Knoten-IDs aus der alten Version sind dann ungültig).
+        """
+        self._last_check = time.monotonic()
+        if _current_dir(self.path) != self.data_dir:
+            fresh = GraphSnapshot.open(self.path)
+            self.__dict__.update(fresh.__dict__)
+            return True
+        self._replay_delta()
+        return False
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._last_check >= REFRESH_CHECK_S:
+            self.refresh()
+
+    # ---------------- Lookup ----------------
+    def node_id(self, label: str, key: str) -> Optional[int]:
+        self._maybe_refresh()
+        return self._node_index.get((label, key))
+
+    def node(self, i: int) -> NodeKey:
+        return self.nodes[i]
+
+    def _etype_codes(self, edge_types: Optional[Sequence[str]]):
+        if edge_types is None:
+            return None
+        return np.asarray([self._etype_index[t] for t in edge_types if t in self._etype_index], dtype=np.int16)
+
+    def neighbors(self, i: int, edge_types: Optional[Sequence[str]] = None, direction: str = "out") -> np.ndarray:
+        self._maybe_refresh()
+        codes = self._etype_codes(edge_types)
+        return self._neighbors(i, codes, direction)
+
+    def _neighbors(self, i: int, codes, direction: str) -> np.ndarray:
+        parts = []
+        for d in (("out", "in") if direction == "both" else (direction,)):
+            indptr, indices, etypes, delta = (
+                (self.out_indptr, self.out_indices, self.out_etypes, self._delta_out) if d == "out"
+                else (self.in_indptr, self.in_indices, self.in_etypes, self._delta_in)
+            )
+            if i < self._n_csr_nodes:
+                lo, hi = indptr[i], indptr[i + 1]
+                nbrs = indices[lo:hi]
+                if codes is not None:
+                    nbrs = nbrs[np.isin(etypes[lo:hi], codes)]
+                parts.append(nbrs)
+            extra = delta.get(i)
+            if extra:
+                parts.append(np.asarray(
+                    [n for n, t in extra if codes is None or t in codes], dtype=np.int32
+                ))
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def k_hop(
+        self,
+        seeds: Iterable[int],
+        k: int = 1,
+        edge_types: Optional[Sequence[str]] = None,
+        direction: str = "both",
+        labels: Optional[Sequence[str]] = None,
+    ) -> Dict[int, int]:
+        """BFS bis Tiefe k; liefert {node_id: hop}. labels filtert nur das Ergebnis, nicht den Pfad."""
+        self._maybe_refresh()
+        codes = self._etype_codes(edge_types)
+        depth: Dict[int, int] = {int(s): 0 for s in seeds}
+        frontier = list(depth)
+        for hop in range(1, k + 1):
+            nxt = []
+            for u in frontier:
+                for v in self._neighbors(u, codes, direction).tolist():
+                    if v not in depth:
+                        depth[v] = hop
+                        nxt.append(v)
+            if not nxt:
+                break
+            frontier = nxt
+        if labels is not None:
+            wanted = set(labels)
+            depth = {n: h for n, h in depth.items() if self.nodes[n][0] in wanted}
+        return depth
+
+    # ---------------- Inkrementeller Refresh ----------------
+    def add_edges(self, edges: Iterable[EdgeRow], persist: bool = True) -> int:
+        """Vom Graph-Loader aufrufen, wenn neue Kanten geschrieben wurden."""
+        rows = [tuple(e) for e in edges]
+        if not rows:
+            return 0
+        if persist:
+            # Version/Zeilen anderer Prozesse vorher übernehmen, sonst schreiben wir ins alte Delta
+            # bzw. der Offset überspringt fremde Zeilen
+            self.refresh()
+        for row in rows:
+            self._apply_delta(row)
+        if persist:
+            with (self.data_dir / "delta.jsonl").open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+                self._delta_offset = f.tell()
+        if self.delta_size() >= COMPACT_THRESHOLD:
+            self.compact()
+        return len(rows)
+
+    def _apply_delta(self, row: EdgeRow):
+        sl, sk, t, dl, dk = row
+        ids = []
+        for key in ((sl, sk), (dl, dk)):
+            if key not in self._node_index:
+                self._node_index[key] = len(self.nodes)
+                self.nodes.append(key)
+            ids.append(self._node_index[key])
+        if t not in self._etype_index:
+            self._etype_index[t] = len(self.edge_types)
+            self.edge_types.append(t)
+        code = self._etype_index[t]
+        s, d = ids
+        # doppelte Kanten (MERGE im Loader) nicht doppelt zählen
+        if d in self._neighbors(s, np.asarray([code], dtype=np.int16), "out").tolist():
+            return
+        self._delta_out.setdefault(s, []).append((d, code))
+        self._delta_in.setdefault(d, []).append((s, code))
+
+    def _replay_delta(self):
+        # ab dem letzten Offset lesen; eine halb geschriebene letzte Zeile bleibt für den nächsten Aufruf
+        delta = self.data_dir / "delta.jsonl"
+        if not delta.exists() or delta.stat().st_size <= self._delta_offset:
+            return
+        with delta.open("rb") as f:
+            f.seek(self._delta_offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                self._apply_delta(tuple(json.loads(line)))
+        self._delta_offset += len(complete)
+
+    def delta_size(self) -> int:
+        return sum(len(v) for v in self._delta_out.values())
+
+    def compact(self) -> "GraphSnapshot":
+        """Merged das Delta in neue CSR-Arrays (neues Versionsverzeichnis, atomarer Tausch von CURRENT)."""
+        n = len(self.nodes)
+        src = [np.repeat(np.arange(self._n_csr_nodes, dtype=np.int64), np.diff(self.out_indptr))]
+        dst = [np.asarray(self.out_indices, dtype=np.int64)]
+        et = [np.asarray(self.out_etypes, dtype=np.int64)]
+        for s, lst in self._delta_out.items():
+            src.append(np.full(len(lst), s, dtype=np.int64))
+            dst.append(np.asarray([d for d, _ in lst], dtype=np.int64))
+            et.append(np.asarray([t for _, t in lst], dtype=np.int64))
+        src_a, dst_a, et_a = np.concatenate(src), np.concatenate(dst), np.concatenate(et)
+
+        self.out_indptr, self.out_indices, self.out_etypes = _build_csr(n, src_a, dst_a, et_a)
+        self.in_indptr, self.in_indices, self.in_etypes = _build_csr(n, dst_a, src_a, et_a)
+        self.version += 1
+        self._delta_out.clear(); self._delta_in.clear()
+        self._n_csr_nodes = n
+        self._write(self.path)  # neue Version startet ohne delta.jsonl
+
+        fresh = GraphSnapshot.open(self.path)
+        self.__dict__.update(fresh.__dict__)
+        return self
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "nodes": len(self.nodes),
+            "edges": int(self.out_indptr[-1]) + self.delta_size(),
+            "delta_edges": self.delta_size(),
+            "edge_types": len(self.edge_types),
+            "version": self.version,
+        }
+
+# ---------------- Export aus Neo4j ----------------
+def _key_expr(var: str) -> str:
+    # Product/Interface/Category haben name, Document/Spec haben id
+    return f"toString(coalesce({var}.name, {var}.id, elementId({var})))"
+
+def export_from_neo4j(driver, path: Path) -> GraphSnapshot:
+    """Zieht alle Knoten/Kanten aus Neo4j und baut einen frischen Snapshot."""
+    with driver.session() as s:
+        nodes = s.run(f"""
+        MATCH (n)
+        RETURN labels(n)[0] AS label, {_key_expr("n")} AS key
+        """).values()
+        edges = s.run(f"""
+        MATCH (n)-[r]->(m)
+        RETURN labels(n)[0], {_key_expr("n")}, type(r), labels(m)[0], {_key_expr("m")}
+        """).values()
+    snap = GraphSnapshot.build(path, (tuple(e) for e in edges), (tuple(n) for n in nodes))
+    print(f"[OK] Graph-Snapshot: {snap.stats()} → {path}")
+    return snap
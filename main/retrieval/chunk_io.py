@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"  # gleiches Modell wie der Chunking-Tokenizer
+
+def default_out_dir() -> Path:
+    # main/retrieval/ -> main/out
+    return Path(__file__).resolve().parent.parent / "out"
+
+def load_chunks(out_dir: Optional[Path] = None, categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Liest alle out/<Category>/docling_chunks.jsonl in eine Liste (Reihenfolge = Zeilen-ID)."""
+    out_dir = Path(out_dir) if out_dir else default_out_dir()
+    records: List[Dict[str, Any]] = []
+    for path in sorted(out_dir.glob("*/docling_chunks.jsonl")):
+        if categories and path.parent.name not in categories:
+            continue
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records
+
+def load_embedder(model_id: str = EMBED_MODEL_ID):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_id)
+
+def embed_texts(model, texts: List[str], batch_size: int = 64):
+    # normalisiert -> Skalarprodukt == Cosine
+    return model.encode(
+        texts, batch_size=batch_size, convert_to_numpy=True,
+        normalize_embeddings=True, show_progress_bar=False,
+    ).astype("float32")
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Bitmap-Facettenindex über die Chunk-Metadaten (category/product/element/tutorial/section/mentions).
+
+Pro Metadaten-Wert ein komprimiertes Bitmap (pyroaring, falls installiert; sonst
+Python-int als Bitset). Zeilen-IDs = Position in load_chunks(), also dieselbe
+Reihenfolge wie im QuantizedIndex – das Ergebnis kann direkt als candidates
+an die Vektorsuche gehen.
+
+    fx = FacetIndex.build(load_chunks())
+    bm = fx.filter({"and": [{"category": "Portenta Family"},
+                            {"not": {"tutorial": None}}]})
+    fx.facet_counts("product", within=bm)
+    idx.search(q, k=10, candidates=fx.to_array(bm))
+"""
+import base64
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+FACETS = ("category", "product", "element", "tutorial", "section", "mentions")
+
+try:
+    from pyroaring import BitMap
+except ImportError:  # Fallback ohne Zusatzpaket
+    BitMap = None
+
+class IntBitmap:
+    """
+    Minimaler Ersatz für pyroaring.BitMap auf Basis eines Python-int. Auf- und Abbau
+    laufen über numpy (packbits/unpackbits), nicht Bit für Bit (quadratisch im int).
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, ids: Iterable[int] = (), bits: int = 0):
+        rows = np.fromiter(ids, dtype=np.int64)
+        if rows.size:
+            flags = np.zeros(int(rows.max()) + 1, dtype=bool)
+            flags[rows] = True
+            bits |= int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+        self.bits = bits
+
+    @classmethod
+    def full(cls, n: int) -> "IntBitmap":
+        return cls(bits=(1 << n) - 1)
+
+    def __and__(self, other): return IntBitmap(bits=self.bits & other.bits)
+    def __or__(self, other): return IntBitmap(bits=self.bits | other.bits)
+    def __sub__(self, other): return IntBitmap(bits=self.bits & ~other.bits)
+    def __len__(self): return self.bits.bit_count()
+    def __eq__(self, other): return isinstance(other, IntBitmap) and self.bits == other.bits
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_array().tolist())
+
+    def to_array(self) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(np.frombuffer(self.serialize(), dtype=np.uint8), bitorder="little"))
+
+    def intersection_cardinality(self, other) -> int:
+        return (self.bits & other.bits).bit_count()
+
+    def serialize(self) -> bytes:
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "IntBitmap":
+        return cls(bits=int.from_bytes(data, "little"))
+
+def _bitmap_cls(backend: Optional[str]):
+    if backend == "int" or (backend is None and BitMap is None):
+        return IntBitmap
+    if BitMap is None:
+        raise ImportError("pyroaring ist nicht installiert (pip install pyroaring)")
+    return BitMap
+
+def _key(value: Any) -> str:
+    # JSON-Keys sind Strings; None bekommt einen eigenen Schlüssel
+    return "\x00none" if value is None else str(value)
+
+class FacetIndex:
+    def __init__(self, chunk_ids: List[str], bitmaps: Dict[str, Dict[str, Any]], bitmap_cls):
+        self.chunk_ids = chunk_ids
+        self.bitmaps = bitmaps
+        self._cls = bitmap_cls
+        self.all = IntBitmap.full(len(chunk_ids)) if bitmap_cls is IntBitmap else bitmap_cls(range(len(chunk_ids)))
+        self._empty = bitmap_cls()
+
+    # ---------------- Build / IO ----------------
+    @classmethod
+    def build(cls, records: List[Dict[str, Any]], facets: Iterable[str] = FACETS,
+              backend: Optional[str] = None) -> "FacetIndex":
+        bitmap_cls = _bitmap_cls(backend)
+        ids: Dict[str, Dict[str, List[int]]] = {f: {} for f in facets}
+        for row, rec in enumerate(records):
+            for f in ids:
+                val = rec.get(f)
+                # Listenfelder (mentions): Zeile in jedes Bitmap der enthaltenen Werte
+                for v in (val or [None]) if isinstance(val, list) else (val,):
+                    ids[f].setdefault(_key(v), []).append(row)
+        bitmaps = {f: {v: bitmap_cls(rows) for v, rows in vals.items()} for f, vals in ids.items()}
+        return cls([r["chunk_id"] for r in records], bitmaps, bitmap_cls)
+
+    def save(self, path: Path):
+        payload = {
+            "backend": "roaring" if self._cls is BitMap else "int",
+            "chunk_ids": self.chunk_ids,
+            "bitmaps": {
+                f: {v: base64.b64encode(bm.serialize()).decode("ascii") for v, bm in vals.items()}
+                for f, vals in self.bitmaps.items()
+            },
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "FacetIndex":
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        bitmap_cls = _bitmap_cls("int" if payload["backend"] == "int" else "roaring")
+        bitmaps = {
+            f: {v: bitmap_cls.deserialize(base64.b64decode(s)) for v, s in vals.items()}
+            for f, vals in payload["bitmaps"].items()
+        }
+        return cls(payload["chunk_ids"], bitmaps, bitmap_cls)
+
+    # ---------------- Abfragen ----------------
+    def values(self, facet: str) -> List[Optional[str]]:
+        return [None if v == _key(None) else v for v in self.bitmaps[facet]]
+
+    def lookup(self, facet: str, value: Any):
+        if facet not in self.bitmaps:
+            raise KeyError(f"unbekannte Facette: {facet!r} (vorhanden: {list(self.bitmaps)})")
+        if isinstance(value, (list, tuple, set)):  # Liste = ODER
+            out = self._empty
+            for v in value:
+                out = out | self.lookup(facet, v)
+            return out
+        return self.bitmaps[facet].get(_key(value), self._empty)
+
+    def filter(self, expr: Optional[Dict[str, Any]]):
+        """
+        Boolescher Ausdruck als dict:
+          {"and": [e1, e2]}, {"or": [e1, e2]}, {"not": e},
+          {"product": "Nano Matter"}, {"product": ["Nano Matter", "Nano Every"]}, {"tutorial": None}
+        Mehrere Facetten in einem dict werden mit UND verknüpft. None/{} = alle Zeilen.
+        """
+        if not expr:
+            return self.all
+        out = self.all
+        for key, val in expr.items():
+            if key == "and":
+                for e in val:
+                    out = out & self.filter(e)
+            elif key == "or":
+                acc = self._empty
+                for e in val:
+                    acc = acc | self.filter(e)
+                out = out & acc
+            elif key == "not":
+                out = out & (self.all - self.filter(val))
+            else:
+                out = out & self.lookup(key, val)
+        return out
+
+    def where(self, **facets):
+        return self.filter(facets)
+
+    def facet_counts(self, facet: str, within=None, top: Optional[int] = None) -> Dict[Optional[str], int]:
+        within = self.all if within is None else within
+        counts = {}
+        for v, bm in self.bitmaps[facet].items():
+            n = bm.intersection_cardinality(within)
+            if n:
+                counts[None if v == _key(None) else v] = n
+        items = sorted(counts.items(), key=lambda kv: -kv[1])
+        return dict(items[:top] if top else items)
+
+    def to_array(self, bm):
+        if isinstance(bm, IntBitmap):
+            return bm.to_array()
+        return np.fromiter(iter(bm), dtype=np.int64, count=len(bm))
+
+    def to_chunk_ids(self, bm) -> List[str]:
+        return [self.chunk_ids[i] for i in bm]
+
+def main():
+    import argparse
+    import time
+    from chunk_io import default_out_dir, load_chunks
+
+    ap = argparse.ArgumentParser(description="Build bitmap facet index over chunk metadata")
+    ap.add_argument("--out-dir", type=Path, default=None)
+    ap.add_argument("--backend", choices=["roaring", "int"], default=None)
+    args = ap.parse_args()
+
+    out_dir = args.out_dir or default_out_dir()
+    records = load_chunks(out_dir)
+    fx = FacetIndex.build(records, backend=args.backend)
+    fx.save(out_dir / "_index" / "facets.json")
+
+    t0 = time.perf_counter()
+    bm = fx.filter({"category": fx.values("category")[0]})
+    counts = fx.facet_counts("product", within=bm)
+    dt = (time.perf_counter() - t0) * 1e6
+    print(f"[OK] {len(records)} Chunks, Filter + Facet-Counts in {dt:.0f} µs: {counts}")
+
+if __name__ == "__main__":
+    main()
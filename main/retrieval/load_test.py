@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Lastgenerator für die Retrieval-Seite: wie viele Queries/s schafft ein Retriever
+und woher kommt die Tail-Latenz?
+
+Queries kommen aus einem Query-Log (jsonl mit "q" oder eine Query pro Zeile) oder
+werden aus Sections + Produktnamen der Chunks synthetisiert. Jeder Retriever
+liefert pro Query seine Stage-Zeiten (z. B. embed/search), der Harness misst
+zusätzlich "total" und schreibt das Ergebnis als JSON, damit Läufe vergleichbar sind.
+
+    python load_test.py local --concurrency 8 --n 2000
+    python load_test.py neo4j --concurrency 16 --duration 30
+    python load_test.py http --url http://127.0.0.1:8080 --concurrency 64
+    python load_test.py compare ../out/_loadtest/*.json
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# ---------------- Stage-Timing ----------------
+class StageTimer:
+    def __init__(self):
+        self.ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ms[name] = self.ms.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+# ---------------- Retriever-Adapter ----------------
+# Jeder Retriever: search(query, k, timer) -> Liste von chunk_ids
+class LocalIndexRetriever:
+    name = "local"
+
+    def __init__(self, index, embed_fn, facets=None):
+        self.index = index
+        self.embed_fn = embed_fn
+        self.facets = facets
+
+    def search(self, query: str, k: int, timer: StageTimer) -> List[str]:
+        with timer.stage("embed"):
+            vec = self.embed_fn([query])[0]
+        with timer.stage("search"):
+            ids, _ = self.index.search(vec, k=k)
+        return ids
+
+# Lucene-Sonderzeichen, sonst wirft der Fulltext-Index bei "I/O" oder "(3.3V)" Fehler
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+class Neo4jFulltextRetriever:
+    name = "neo4j_fts"
+
+    def __init__(self, driver, index_name: str = "doc_text_fts"):
+        self.driver = driver
+        self.index_name = index_name
+
+    def search(self, query: str, k: int, timer: StageTimer) -> List[str]:
+        q = _LUCENE_SPECIAL.sub(r"\\\1", query)
+        with timer.stage("session"):
+            session = self.driver.session()
+        try:
+            with timer.stage("query"):
+                result = session.run(
+                    "CALL db.index.fulltext.queryNodes($idx, $q) YIELD node, score "
+                    "RETURN node.id AS id, score LIMIT $k",
+                    idx=self.index_name, q=q, k=k,
+                )
+            with timer.stage("fetch"):
+                return [r["id"] for r in result]
+        finally:
+            session.close()
+
+class HttpRetriever:
+    name = "http"
+
+    def __init__(self, url: str = "http://127.0.0.1:8080", bypass_cache: bool = False):
+        self.url = url.rstrip("/")
+        self.bypass_cache = bypass_cache
+        # der Server cached Antworten -> wiederholte Queries messen sonst nur den Cache
+        self.cached = not bypass_cache
+
+    def search(self, query: str, k: int, timer: StageTimer) -> List[str]:
+        from urllib.request import Request, urlopen
+        params = {"q": query, "k": k}
+        if self.bypass_cache:
+            params["nocache"] = True
+        body = json.dumps(params).encode("utf-8")
+        with timer.stage("http"):
+            with urlopen(Request(self.url + "/search", data=body, method="POST"), timeout=30) as resp:
+                payload = json.loads(resp.read())
+        return [r["chunk_id"] for r in payload["results"]]
+
+# ---------------- Queries ----------------
+QUERY_TEMPLATES = [
+    "{section} {product}",
+    "What is the {section} of the {product}?",
+    "{product} {section}",
+    "{product} datasheet",
+]
+
+def load_query_log(path: Path) -> List[str]:
+    queries = []
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                rec = json.loads(line)
+                line = rec.get("q") or rec.get("query") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+def _heading(text: Optional[str]) -> Optional[str]:
+    # section ist oft leer -> erste Zeile nach dem "[Product: ...]"-Präfix ist meist die Überschrift
+    body = (text or "").split("\n\n", 1)[-1]
+    line = body.split("\n", 1)[0].strip()
+    return line if 0 < len(line) <= 60 else None
+
+def synthesize_queries(records: List[Dict[str, Any]], n: int = 500, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    pairs = [(r.get("section") or _heading(r.get("text")), r.get("product")) for r in records if r.get("product")]
+    if not pairs:
+        raise ValueError("keine Chunks mit product-Feld für Query-Synthese")
+    out = []
+    for _ in range(n):
+        section, product = rng.choice(pairs)
+        tpl = rng.choice(QUERY_TEMPLATES if section else QUERY_TEMPLATES[-1:])
+        out.append(tpl.format(section=(section or "").lower(), product=product))
+    return out
+
+# ---------------- Runner ----------------
+def _summary(values: Sequence[float]) -> Dict[str, float]:
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+def run_load(
+    retriever,
+    queries: List[str],
+    concurrency: int = 8,
+    k: int = 10,
+    n: Optional[int] = None,
+    duration_s: Optional[float] = None,
+    warmup: int = 10,
+) -> Dict[str, Any]:
+    """Spielt Queries mit `concurrency` parallelen Workern ab (n Queries oder duration_s Sekunden)."""
+    if not queries:
+        raise ValueError("keine Queries")
+    warmup_errors: Dict[str, int] = defaultdict(int)
+    for q in queries[:warmup]:
+        try:
+            retriever.search(q, k, StageTimer())
+        except Exception as e:
+            warmup_errors[type(e).__name__] += 1
+
+    n = n or (None if duration_s else len(queries))
+    unique = len(set(queries))
+    if getattr(retriever, "cached", False) and (duration_s or n > unique):
+        print(f"[WARN] {unique} verschiedene Queries werden wiederholt und der Retriever cached -> "
+              "Latenzen messen überwiegend Cache-Treffer (--no-cache setzen)")
+    stages: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    counter = iter(range(10**12))
+    stop_at = time.perf_counter() + duration_s if duration_s else None
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter)
+            if (n is not None and i >= n) or (stop_at and time.perf_counter() >= stop_at):
+                return
+            timer = StageTimer()
+            t0 = time.perf_counter()
+            try:
+                retriever.search(queries[i % len(queries)], k, timer)
+            except Exception as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+                continue
+            total = (time.perf_counter() - t0) * 1000
+            with lock:
+                stages["total"].append(total)
+                for name, ms in timer.ms.items():
+                    stages[name].append(ms)
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for f in [pool.submit(worker) for _ in range(concurrency)]:
+            f.result()
+    wall = time.perf_counter() - t_start
+
+    done = len(stages["total"])
+    return {
+        "retriever": getattr(retriever, "name", type(retriever).__name__),
+        "concurrency": concurrency,
+        "k": k,
+        "queries": done,
+        "unique_queries": unique,
+        "cached": bool(getattr(retriever, "cached", False)),
+        "errors": dict(errors),
+        "warmup_errors": dict(warmup_errors),
+        "wall_s": round(wall, 3),
+        "throughput_qps": round(done / wall, 2) if wall else 0.0,
+        "latency_ms": {name: _summary(v) for name, v in stages.items() if v},
+    }
+
+# ---------------- Speichern / Vergleichen ----------------
+def save_result(result: Dict[str, Any], results_dir: Path, label: Optional[str] = None) -> Path:
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+    name = f"{ts}_{label or result['retriever']}_c{result['concurrency']}.json"
+    path = results_dir / name
+    path.write_text(json.dumps({"timestamp": ts, "label": label, **result}, indent=2, ensure_ascii=False),
+                    encoding="utf-8")
+    return path
+
+def compare_runs(paths: Sequence[Path]) -> str:
+    rows = []
+    for p in paths:
+        r = json.loads(Path(p).read_text(encoding="utf-8"))
+        tot = r["latency_ms"].get("total", {})
+        stage_p95 = ", ".join(
+            f"{s}={v['p95']}" for s, v in r["latency_ms"].items() if s != "total"
+        )
+        rows.append(
+            f"{Path(p).stem:<45} {r['throughput_qps']:>9} {tot.get('p50', '-'):>9} "
+            f"{tot.get('p95', '-'):>9} {tot.get('p99', '-'):>9}  {stage_p95}"
+        )
+    header = f"{'run':<45} {'qps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  stage p95 ms"
+    return "\n".join([header, *rows])
+
+# ---------------- main ----------------
+def main():
+    import argparse
+    from chunk_io import default_out_dir, load_chunks
+
+    ap = argparse.ArgumentParser(description="Concurrent load test for retrieval")
+    ap.add_argument("target", choices=["local", "neo4j", "http", "compare"])
+    ap.add_argument("files", nargs="*", type=Path, help="nur für compare: Ergebnis-JSONs")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--n", type=int, default=None)
+    ap.add_argument("--duration", type=float, default=None)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--query-log", type=Path, default=None)
+    ap.add_argument("--out-dir", type=Path, default=None)
+    ap.add_argument("--index-dir", type=Path, default=None)
+    ap.add_argument("--mode", choices=["none", "int8", "binary"], default="int8")
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--no-cache", action="store_true", help="http: Server-Cache umgehen")
+    ap.add_argument("--neo4j-uri", default="bolt://localhost:7687")
+    ap.add_argument("--neo4j-user", default="neo4j")
+    ap.add_argument("--neo4j-password", default="testmaster123")
+    ap.add_argument("--label", default=None)
+    args = ap.parse_args()
+
+    out_dir = args.out_dir or default_out_dir()
+    results_dir = out_dir / "_loadtest"
+    if args.target == "compare":
+        print(compare_runs(args.files or sorted(results_dir.glob("*.json"))))
+        return
+
+    queries = load_query_log(args.query_log) if args.query_log else synthesize_queries(load_chunks(out_dir))
+
+    if args.target == "local":
+        from chunk_io import embed_texts, load_embedder
+        from quantized_index import QuantizedIndex
+        model = load_embedder()
+        index = QuantizedIndex.open(args.index_dir or (out_dir / "_index"), args.mode)
+        retriever = LocalIndexRetriever(index, lambda texts: embed_texts(model, texts))
+    elif args.target == "neo4j":
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(args.neo4j_uri, auth=(args.neo4j_user, args.neo4j_password))
+        retriever = Neo4jFulltextRetriever(driver)
+    else:
+        retriever = HttpRetriever(args.url, bypass_cache=args.no_cache)
+
+    result = run_load(retriever, queries, concurrency=args.concurrency, k=args.k,
+                      n=args.n, duration_s=args.duration)
+    path = save_result(result, results_dir, args.label)
+    print(json.dumps(result, indent=2))
+    print(f"[OK] Ergebnis gespeichert: {path}")
+
+if __name__ == "__main__":
+    main()
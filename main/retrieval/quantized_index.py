@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Quantisierte Speicherung der Chunk-Embeddings mit exaktem Rescoring.
+
+Erster Durchlauf sucht über kompakte Codes (int8: 1 Byte/Dim, binary: 1 Bit/Dim),
+danach werden rescore_k Kandidaten gegen die float32-Vektoren neu bewertet.
+Die float32-Matrix wird nur per mmap gelesen (lazy, nur die Kandidaten-Zeilen).
+
+Jeder build() schreibt ein neues Versionsverzeichnis (index_dir/v<ns>/) und tauscht danach
+index_dir/CURRENT per os.replace: ein laufender Server behält seine mmaps auf der alten
+Version (np.save über die gemappte Datei würde sie abschneiden -> Bus error).
+
+    QuantizedIndex.build(index_dir, embeddings, chunk_ids)
+    idx = QuantizedIndex.open(index_dir, mode="int8")
+    ids, scores = idx.search(query_vec, k=10)
+
+    python quantized_index.py --out-dir ../out --index-dir ../out/_index
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODES = ("none", "int8", "binary")
+BLOCK_ROWS = 2048  # int8 -> float32 blockweise (cache-freundlich, begrenzter Temp-Speicher)
+KEEP_VERSIONS = 2  # alte Versionsverzeichnisse, die für noch öffnende Leser stehen bleiben
+
+# popcount-Tabelle für numpy < 2.0 (kein np.bitwise_count)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount(a: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(a)
+    return _POPCOUNT[a]
+
+# ---------------- Quantisierung ----------------
+def quantize_int8(emb: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetrisch pro Dimension: x ≈ codes * scale."""
+    scale = np.abs(emb).max(axis=0, initial=0.0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(emb / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+def quantize_binary(emb: np.ndarray) -> np.ndarray:
+    return np.packbits(emb > 0, axis=1)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+class QuantizedIndex:
+    def __init__(self, index_dir: Path, mode: str, chunk_ids: List[str], full: np.ndarray,
+                 codes: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None,
+                 version: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"unbekannter Modus {mode!r}, erlaubt: {MODES}")
+        self.index_dir = Path(index_dir)
+        self.version = version
+        self.mode = mode
+        self.chunk_ids = chunk_ids
+        self.full = full      # float32, mmap (mode != none) bzw. im RAM (mode == none)
+        self.codes = codes
+        self.scale = scale
+
+    # ---------------- Build / IO ----------------
+    @staticmethod
+    def build(index_dir: Path, embeddings: np.ndarray, chunk_ids: Sequence[str]):
+        """Schreibt float32-Vektoren + int8- und binary-Codes; der Modus wird erst beim open() gewählt."""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        emb = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(emb) != len(chunk_ids):
+            raise ValueError(f"{len(emb)} Embeddings, aber {len(chunk_ids)} chunk_ids")
+        name = f"v{time.time_ns()}"
+        tmp = index_dir / (name + ".tmp")
+        tmp.mkdir()
+        np.save(tmp / "vectors_f32.npy", emb)
+        codes, scale = quantize_int8(emb)
+        np.save(tmp / "codes_int8.npy", codes)
+        np.save(tmp / "scale_int8.npy", scale)
+        np.save(tmp / "codes_binary.npy", quantize_binary(emb))
+        (tmp / "chunk_ids.json").write_text(json.dumps(list(chunk_ids), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, index_dir / name)
+        pointer_tmp = index_dir / f"CURRENT.{os.getpid()}.tmp"
+        pointer_tmp.write_text(name, encoding="utf-8")
+        os.replace(pointer_tmp, index_dir / "CURRENT")
+        QuantizedIndex._prune(index_dir, name)
+
+    @staticmethod
+    def _prune(index_dir: Path, current: str):
+        # nur ältere Versionen löschen; die letzten KEEP_VERSIONS bleiben für Leser, die gerade öffnen
+        versions = sorted((p for p in index_dir.glob("v*") if p.is_dir() and p.name[1:].isdigit()
+                           and p.name != current), key=lambda p: int(p.name[1:]))
+        for old in versions[:max(0, len(versions) - KEEP_VERSIONS)]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def current_version(index_dir: Path) -> str:
+        """Name der aktiven Version; altes, flaches Layout ohne CURRENT: mtime von chunk_ids.json."""
+        pointer = Path(index_dir) / "CURRENT"
+        if pointer.exists():
+            return pointer.read_text(encoding="utf-8").strip()
+        return f"flat-{(Path(index_dir) / 'chunk_ids.json').stat().st_mtime_ns}"
+
+    @classmethod
+    def open(cls, index_dir: Path, mode: str = "int8") -> "QuantizedIndex":
+        index_dir = Path(index_dir)
+        version = cls.current_version(index_dir)  # Zeiger einmal lesen, danach nur noch diese Version
+        data_dir = index_dir if version.startswith("flat-") else index_dir / version
+        chunk_ids = json.loads((data_dir / "chunk_ids.json").read_text(encoding="utf-8"))
+        if mode == "none":
+            return cls(index_dir, mode, chunk_ids, np.load(data_dir / "vectors_f32.npy"), version=version)
+        full = np.load(data_dir / "vectors_f32.npy", mmap_mode="r")
+        if mode == "int8":
+            return cls(index_dir, mode, chunk_ids, full,
+                       codes=np.load(data_dir / "codes_int8.npy"),
+                       scale=np.load(data_dir / "scale_int8.npy"), version=version)
+        return cls(index_dir, mode, chunk_ids, full, codes=np.load(data_dir / "codes_binary.npy"),
+                   version=version)
+
+    # ---------------- Suche ----------------
+    def _approx_scores(self, q: np.ndarray) -> np.ndarray:
+        if self.mode == "none":
+            return self.full @ q
+        if self.mode == "int8":
+            qs = (q * self.scale).astype(np.float32)
+            out = np.empty(len(self.codes), dtype=np.float32)
+            for lo in range(0, len(self.codes), BLOCK_ROWS):
+                out[lo:lo + BLOCK_ROWS] = self.codes[lo:lo + BLOCK_ROWS].astype(np.float32) @ qs
+            return out
+        # binary: negative Hamming-Distanz
+        qb = np.packbits(q > 0)
+        return -_popcount(np.bitwise_xor(self.codes, qb)).sum(axis=1, dtype=np.int32).astype(np.float32)
+
+    def search(self, q: np.ndarray, k: int = 10, rescore_k: Optional[int] = None,
+               candidates: Optional[np.ndarray] = None) -> Tuple[List[str], np.ndarray]:
+        """Top-k Chunk-IDs + Scores (siehe search_rows)."""
+        rows, scores = self.search_rows(q, k, rescore_k, candidates)
+        return [self.chunk_ids[i] for i in rows], scores
+
+    def search_rows(self, q: np.ndarray, k: int = 10, rescore_k: Optional[int] = None,
+                    candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k Zeilen-IDs + Scores (chunk_ids sind nicht eindeutig, Zeilen schon).
+        rescore_k = Größe der Kandidatenmenge für das exakte Rescoring
+        (Default 4*k bzw. 10*k für binary). candidates schränkt auf Zeilen-IDs ein (z. B. Facetten-Filter).
+        """
+        q = np.asarray(q, dtype=np.float32).ravel()
+        approx = self._approx_scores(q)
+        if candidates is not None:
+            mask = np.full(len(approx), -np.inf, dtype=np.float32)
+            mask[candidates] = 0.0
+            approx = approx + mask
+        if self.mode == "none":
+            top = _top_k(approx, k)
+            top = top[np.isfinite(approx[top])]
+            return top, approx[top]
+
+        rescore_k = rescore_k or (10 * k if self.mode == "binary" else 4 * k)
+        cand = _top_k(approx, rescore_k)
+        cand = cand[np.isfinite(approx[cand])]
+        cand.sort()  # sequentieller mmap-Zugriff
+        exact = np.asarray(self.full[cand], dtype=np.float32) @ q
+        order = np.argsort(-exact, kind="stable")[:k]
+        return cand[order], exact[order]
+
+    def memory_bytes(self) -> int:
+        """Im RAM gehaltene Bytes (mmap-Vektoren zählen nicht)."""
+        if self.mode == "none":
+            return int(self.full.nbytes)
+        n = int(self.codes.nbytes)
+        if self.scale is not None:
+            n += int(self.scale.nbytes)
+        return n
+
+# ---------------- Evaluation ----------------
+def evaluate_modes(index_dir: Path, queries: np.ndarray, k: int = 10,
+                   modes: Sequence[str] = MODES, rescore_k: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    """Speicher, Latenz und recall@k je Modus gegenüber der unquantisierten Suche."""
+    exact = QuantizedIndex.open(index_dir, "none")
+    # Zeilen statt chunk_ids vergleichen: dieselbe ID kann mehrfach vorkommen (z. B. ein
+    # Datenblatt unter mehreren Portenta-H7-Produkten)
+    truth = [set(exact.search_rows(q, k)[0].tolist()) for q in queries]
+    report: Dict[str, Dict[str, float]] = {}
+    for mode in modes:
+        idx = exact if mode == "none" else QuantizedIndex.open(index_dir, mode)
+        lat, hits = [], 0
+        for q, t in zip(queries, truth):
+            t0 = time.perf_counter()
+            rows, _ = idx.search_rows(q, k, rescore_k=rescore_k)
+            lat.append((time.perf_counter() - t0) * 1000)
+            hits += len(t.intersection(rows.tolist()))
+        report[mode] = {
+            "memory_mb": round(idx.memory_bytes() / 2**20, 3),
+            "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+            "latency_ms_p95": round(float(np.percentile(lat, 95)), 3),
+            f"recall@{k}": round(hits / max(1, sum(len(t) for t in truth)), 4),
+        }
+    return report
+
+# ---------------- main ----------------
+def main():
+    import argparse
+    from chunk_io import default_out_dir, embed_texts, load_chunks, load_embedder
+
+    ap = argparse.ArgumentParser(description="Build + evaluate quantized chunk embedding index")
+    ap.add_argument("--out-dir", type=Path, default=None)
+    ap.add_argument("--index-dir", type=Path, default=None)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--n-queries", type=int, default=200)
+    args = ap.parse_args()
+
+    out_dir = args.out_dir or default_out_dir()
+    index_dir = args.index_dir or (out_dir / "_index")
+    records = load_chunks(out_dir)
+    model = load_embedder()
+    emb = embed_texts(model, [r["text"] for r in records])
+    QuantizedIndex.build(index_dir, emb, [r["chunk_id"] for r in records])
+    print(f"[OK] {len(records)} Embeddings → {index_dir}")
+
+    # Queries: Section-Titel + Produktname (wie echte Nutzerfragen kurz)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(records), size=min(args.n_queries, len(records)), replace=False)
+    q_texts = [f"{records[i].get('section') or ''} {records[i]['product']}".strip() for i in sample]
+    queries = embed_texts(model, q_texts)
+
+    for mode, stats in evaluate_modes(index_dir, queries, k=args.k).items():
+        print(f"{mode:>7}: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio-Query-Server für die Chunk-Suche (nur stdlib + numpy).
+
+- gleichzeitige Anfragen werden zu Micro-Batches gebündelt und gemeinsam
+  mit dem MiniLM-Modell eingebettet (ein encode()-Aufruf pro Batch)
+- LRU-Cache: normalisierte Query (+k, Filter) -> gerankte Chunk-IDs,
+  wird verworfen, sobald sich die Index-Version ändert
+- Metriken (Latenz-Perzentile, Batch-Größen, Cache-Hit-Rate) unter GET /metrics
+
+    python query_server.py --index-dir ../out/_index --port 8080
+    curl 'localhost:8080/search?q=operating+voltage+nano+every&k=5'
+    curl -d '{"q": "i2c pins", "filters": {"category": "Nano Family"}}' localhost:8080/search
+"""
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from quantized_index import QuantizedIndex
+
+# ---------------- Hilfsfunktionen ----------------
+def normalize_query(q: str) -> str:
+    q = (q or "").lower().strip()
+    q = re.sub(r"\s+", " ", q)
+    return q.strip(" ?!.")
+
+def percentiles(values, ps=(50, 95, 99)) -> Dict[str, float]:
+    if not values:
+        return {f"p{p}": 0.0 for p in ps}
+    arr = np.fromiter(values, dtype=np.float64)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in ps}
+
+# ---------------- Metriken ----------------
+class Metrics:
+    def __init__(self, window: int = 10_000):
+        self.latency_ms = deque(maxlen=window)
+        self.embed_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.requests = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": percentiles(self.latency_ms),
+            "embed_batch_ms": percentiles(self.embed_ms),
+            "batch_size": {
+                "mean": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+                "max": max(self.batch_sizes, default=0),
+                "batches": len(self.batch_sizes),
+            },
+            "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+        }
+
+# ---------------- LRU-Cache ----------------
+class QueryCache:
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.version: Any = None
+        self._data: "OrderedDict[Tuple, Any]" = OrderedDict()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._data.clear()
+            self.version = version
+
+    def get(self, key: Tuple, version):
+        self._check_version(version)
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: Tuple, value, version):
+        self._check_version(version)
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+# ---------------- Micro-Batching ----------------
+class MicroBatcher:
+    """Sammelt Texte bis max_batch oder max_wait_ms und bettet sie gemeinsam ein."""
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray], metrics: Metrics,
+                 max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.embed_fn = embed_fn
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [t for t, _ in batch]
+            t0 = time.perf_counter()
+            try:
+                # encode() blockiert -> Thread, damit der Event-Loop weiter Anfragen annimmt
+                vecs = await loop.run_in_executor(None, self.embed_fn, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.metrics.embed_ms.append((time.perf_counter() - t0) * 1000)
+            self.metrics.batch_sizes.append(len(batch))
+            for (_, fut), v in zip(batch, vecs):
+                if not fut.done():
+                    fut.set_result(v)
+
+# ---------------- Service ----------------
+class QueryService:
+    def __init__(self, index_dir: Path, embed_fn: Callable[[List[str]], np.ndarray],
+                 mode: str = "int8", facets=None, cache_size: int = 4096,
+                 max_batch: int = 32, max_wait_ms: float = 5.0, version_check_s: float = 1.0):
+        self.index_dir = Path(index_dir)
+        self.mode = mode
+        self.facets = facets
+        self.metrics = Metrics()
+        self.cache = QueryCache(cache_size)
+        self.batcher = MicroBatcher(embed_fn, self.metrics, max_batch, max_wait_ms)
+        self.version_check_s = version_check_s
+        self._last_check = 0.0
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.index = QuantizedIndex.open(self.index_dir, mode)
+        self.index_version = self._read_version(self.index.version)
+        self._facets_match = self._check_facets()
+
+    def _read_version(self, index_version: Optional[str] = None):
+        # QuantizedIndex.build() tauscht den CURRENT-Zeiger atomar -> dessen Inhalt ist die Version;
+        # facets.json gehört dazu (wird nach dem Index gebaut)
+        facets_path = self.index_dir / "facets.json"
+        return (index_version or QuantizedIndex.current_version(self.index_dir),
+                facets_path.stat().st_mtime_ns if facets_path.exists() else None)
+
+    def _check_facets(self) -> bool:
+        # Facetten-Zeilen müssen exakt die Zeilen des Index sein, sonst zeigen candidates ins Leere
+        return self.facets is None or self.facets.chunk_ids == self.index.chunk_ids
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.version_check_s:
+            return
+        self._last_check = now
+        version = self._read_version()
+        if version != self.index_version:
+            self.index = QuantizedIndex.open(self.index_dir, self.mode)
+            version = self._read_version(self.index.version)  # geöffnete Version, falls inzwischen neu gebaut
+            facets_path = self.index_dir / "facets.json"
+            if self.facets is not None and facets_path.exists():
+                self.facets = type(self.facets).load(facets_path)
+            self._facets_match = self._check_facets()
+            if not self._facets_match:
+                print("[WARN] facets.json passt nicht zum neuen Index -> gefilterte Suchen abgelehnt")
+            self.index_version = version  # Cache wird beim nächsten Zugriff geleert
+            print(f"[OK] Index neu geladen (Version {version})")
+
+    async def _compute(self, text: str, k: int, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        vec = await self.batcher.embed(text)
+        candidates = None
+        if filters and self.facets is not None:
+            if not self._facets_match:
+                raise RuntimeError("Facetten-Index veraltet (facets.json neu bauen), Filter nicht möglich")
+            candidates = self.facets.to_array(self.facets.filter(filters))
+        ids, scores = self.index.search(vec, k=k, candidates=candidates)
+        return [{"chunk_id": c, "score": round(float(s), 4)} for c, s in zip(ids, scores)]
+
+    async def search(self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                     use_cache: bool = True) -> Dict[str, Any]:
+        """use_cache=False umgeht LRU-Cache und In-flight-Dedup (z. B. für Lasttests)."""
+        t0 = time.perf_counter()
+        self.metrics.requests += 1
+        self._maybe_reload()
+        key = (normalize_query(query), k, json.dumps(filters, sort_keys=True) if filters else None)
+        hit = self.cache.get(key, self.index_version) if use_cache else None
+        if not use_cache:
+            self.metrics.cache_misses += 1
+            results, cached = await self._compute(key[0], k, filters), False
+        elif hit is not None:
+            self.metrics.cache_hits += 1
+            results, cached = hit, True
+        elif key in self._inflight:
+            # gleiche Query läuft schon -> auf deren Ergebnis warten statt doppelt einzubetten
+            self.metrics.cache_hits += 1
+            results, cached = await asyncio.shield(self._inflight[key]), True
+        else:
+            self.metrics.cache_misses += 1
+            fut = asyncio.get_running_loop().create_future()
+            # Exception abholen, auch wenn niemand sonst auf die Query wartet
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = fut
+            try:
+                results = await self._compute(key[0], k, filters)
+                fut.set_result(results)
+            except Exception as e:
+                fut.set_exception(e)
+                raise
+            finally:
+                del self._inflight[key]
+            self.cache.put(key, results, self.index_version)
+            cached = False
+        self.metrics.latency_ms.append((time.perf_counter() - t0) * 1000)
+        return {"query": query, "k": k, "cached": cached, "index_version": self.index_version, "results": results}
+
+# ---------------- HTTP (minimal, HTTP/1.1 ohne Keep-Alive) ----------------
+async def _read_request(reader: asyncio.StreamReader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for ln in lines[1:]:
+        if ":" in ln:
+            k, v = ln.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    body = b""
+    if int(headers.get("content-length", 0)):
+        body = await reader.readexactly(int(headers["content-length"]))
+    return method, target, body
+
+def _response(status: int, payload: Dict[str, Any]) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+    head = (
+        f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+def make_handler(service: QueryService):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, target, body = await _read_request(reader)
+            url = urlsplit(target)
+            if url.path == "/search":
+                if method == "POST":
+                    params = json.loads(body or b"{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                    if "filters" in params:
+                        params["filters"] = json.loads(params["filters"])
+                if not params.get("q"):
+                    status, payload = 400, {"error": "parameter 'q' fehlt"}
+                else:
+                    nocache = str(params.get("nocache", "")).lower() in ("1", "true", "yes")
+                    status, payload = 200, await service.search(
+                        params["q"], int(params.get("k", 10)), params.get("filters"), use_cache=not nocache
+                    )
+            elif url.path == "/metrics":
+                status, payload = 200, {**service.metrics.snapshot(), "cache_size": len(service.cache),
+                                        "index_version": service.index_version}
+            elif url.path == "/health":
+                status, payload = 200, {"status": "ok"}
+            else:
+                status, payload = 404, {"error": f"unbekannter Pfad {url.path}"}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            service.metrics.errors += 1
+            status, payload = 500, {"error": str(e)}
+        writer.write(_response(status, payload))
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+    return handle
+
+async def serve(service: QueryService, host: str = "127.0.0.1", port: int = 8080):
+    service.batcher.start()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f"[OK] Query-Server läuft auf http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.batcher.stop()
+
+# ---------------- main ----------------
+def main():
+    import argparse
+    from chunk_io import default_out_dir, embed_texts, load_embedder
+    from facet_index import FacetIndex
+
+    ap = argparse.ArgumentParser(description="Async retrieval server with micro-batched embedding")
+    ap.add_argument("--index-dir", type=Path, default=None)
+    ap.add_argument("--mode", choices=["none", "int8", "binary"], default="int8")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--max-batch", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    ap.add_argument("--cache-size", type=int, default=4096)
+    args = ap.parse_args()
+
+    index_dir = args.index_dir or (default_out_dir() / "_index")
+    facets_path = index_dir / "facets.json"
+    facets = FacetIndex.load(facets_path) if facets_path.exists() else None
+
+    model = load_embedder()
+    service = QueryService(
+        index_dir, lambda texts: embed_texts(model, texts), mode=args.mode, facets=facets,
+        cache_size=args.cache_size, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+    )
+    asyncio.run(serve(service, args.host, args.port))
+
+if __name__ == "__main__":
+    main()